@@ -0,0 +1,98 @@
+"""
+Compare serialization of contact lists through FastAPI's response_model path
+(validate, jsonable_encoder, stdlib json), a TypeAdapter path (validate and
+dump to bytes inside pydantic-core) and the plain row dicts returned by the
+read-only repository queries used by the list endpoints.
+
+Run from the repository root:
+
+    python -m benchmarks.contact_serialization [iterations]
+"""
+
+import asyncio
+import sys
+import time
+from datetime import date, datetime
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response as fastapi_serialize_response
+from fastapi.utils import create_model_field
+from pydantic import TypeAdapter
+
+from src.api.responses import serialize_response, serialize_rows
+from src.database.models import Contact
+from src.repository.contacts import CONTACT_FIELDS
+from src.schemas import ContactModelResponse
+
+SIZES = (100, 1_000, 10_000)
+
+contact_list = TypeAdapter(List[ContactModelResponse])
+
+
+def create_contacts(count: int) -> list[Contact]:
+    return [
+        Contact(
+            id=i,
+            first_name=f"John{i}",
+            last_name="Doe",
+            email=f"john{i}@doe.me",
+            phone="034 434 23 54",
+            date_of_birth=date(1990, 1, 1),
+            info="Benchmark contact",
+            created_at=datetime(2025, 1, 1, 12, 0),
+        )
+        for i in range(count)
+    ]
+
+
+async def response_model_path(field, contacts) -> bytes:
+    content = await fastapi_serialize_response(
+        field=field, response_content=contacts["orm"], is_coroutine=True
+    )
+    return JSONResponse(content).body
+
+
+async def adapter_path(field, contacts) -> bytes:
+    return serialize_response(contact_list, contacts["orm"]).body
+
+
+async def rows_path(field, contacts) -> bytes:
+    return serialize_rows(contacts["rows"]).body
+
+
+async def measure(path, field, contacts, iterations: int) -> tuple[float, int]:
+    body = await path(field, contacts)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await path(field, contacts)
+    return (time.perf_counter() - start) / iterations, len(body)
+
+
+async def main(iterations: int):
+    field = create_model_field(
+        name="Response_contacts",
+        type_=List[ContactModelResponse],
+        mode="serialization",
+    )
+
+    print(f"{'rows':>8}{'path':>16}{'ms/response':>14}{'bytes':>10}")
+    for size in SIZES:
+        orm = create_contacts(size)
+        rows = [
+            {name: getattr(contact, name) for name in CONTACT_FIELDS} for contact in orm
+        ]
+        contacts = {"orm": orm, "rows": rows}
+        repeat = max(1, iterations * SIZES[0] // size)
+        for name, path in (
+            ("response_model", response_model_path),
+            ("type_adapter", adapter_path),
+            ("rows", rows_path),
+        ):
+            seconds, length = await measure(path, field, contacts, repeat)
+            print(f"{size:>8}{name:>16}{seconds * 1000:>14.3f}{length:>10}")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    asyncio.run(main(iterations))
@@ -0,0 +1,146 @@
+"""
+Compare round trips and latency of contact writes before and after switching
+ContactRepository to single INSERT/UPDATE/DELETE ... RETURNING statements.
+
+Both repositories maintain the Contact counter and the dashboard figures.
+The current one folds them into the write on Postgres only, SQLite runs
+them as separate statements in both.
+
+Run from the repository root:
+
+    python -m benchmarks.contact_writes [iterations] [database url]
+
+Defaults to an in-memory SQLite database; pass a postgresql+asyncpg url to
+measure real network round trips.
+"""
+
+import asyncio
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.database.models import Base, Contact, User
+from src.repository.contacts import ContactRepository
+from src.schemas import ContactModel
+
+DEFAULT_URL = "sqlite+aiosqlite:///:memory:"
+
+body = ContactModel(
+    first_name="John",
+    last_name="Doe",
+    email="john@doe.me",
+    phone="034 434 23 54",
+    date_of_birth=date(1990, 1, 1),
+    info="Benchmark",
+)
+
+
+class LegacyContactRepository(ContactRepository):
+    """
+    Write path as it was before RETURNING: select, write, commit, refresh,
+    with the same counter and dashboard upserts as separate statements.
+    """
+
+    async def create_contact(self, body, user):
+        contact = Contact(**body.model_dump(exclude_unset=True), user=user)
+        self.db.add(contact)
+        await self.db.flush()
+        await self._change_counter(user, 1)
+        await self.stats.add_daily(user.id, contacts_created=1)
+        await self.db.commit()
+        await self.db.refresh(contact)
+        return await self.get_contact_by_id(contact.id, user)
+
+    async def update_contact(self, contact_id, body, user):
+        contact = await self.get_contact_by_id(contact_id, user)
+        if contact:
+            for key, value in body.model_dump(exclude_unset=True).items():
+                setattr(contact, key, value)
+            await self.db.commit()
+            await self.db.refresh(contact)
+        return contact
+
+    async def delete_contact(self, contact_id, user):
+        contact = await self.get_contact_by_id(contact_id, user)
+        if contact:
+            await self.db.delete(contact)
+            await self.db.flush()
+            await self._change_counter(user, -1)
+            await self.db.commit()
+        return contact
+
+
+async def run(repository_class, session_maker, user_id, iterations, counter):
+    timings = {"create": 0.0, "update": 0.0, "delete": 0.0}
+    statements = {"create": 0, "update": 0, "delete": 0}
+
+    for _ in range(iterations):
+        async with session_maker() as session:
+            repository = repository_class(session)
+            user = await session.get(User, user_id)
+
+            for operation in ("create", "update", "delete"):
+                counter[0] = 0
+                start = time.perf_counter()
+                if operation == "create":
+                    contact_id = (await repository.create_contact(body, user)).id
+                elif operation == "update":
+                    await repository.update_contact(contact_id, body, user)
+                else:
+                    await repository.delete_contact(contact_id, user)
+                timings[operation] += time.perf_counter() - start
+                statements[operation] += counter[0]
+
+    return timings, statements
+
+
+async def main(iterations: int, url: str):
+    engine = create_async_engine(url)
+    counter = [0]
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(*args):
+        counter[0] += 1
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_maker() as session:
+        user = User(username="bench", email="bench@bench.me")
+        session.add(user)
+        await session.commit()
+
+    results = {}
+    for expire_on_commit, repository_class in (
+        (True, LegacyContactRepository),
+        (False, ContactRepository),
+    ):
+        session_maker = async_sessionmaker(
+            engine, autoflush=False, expire_on_commit=expire_on_commit
+        )
+        results[repository_class.__name__] = await run(
+            repository_class, session_maker, user.id, iterations, counter
+        )
+
+    await engine.dispose()
+
+    print(f"{iterations} iterations against {engine.url.drivername}")
+    print(f"{'repository':<26}{'operation':<10}{'stmts/op':>10}{'ms/op':>10}")
+    for name, (timings, statements) in results.items():
+        for operation in timings:
+            print(
+                f"{name:<26}{operation:<10}"
+                f"{statements[operation] / iterations:>10.1f}"
+                f"{timings[operation] / iterations * 1000:>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    url = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_URL
+    asyncio.run(main(iterations, url))
@@ -0,0 +1,95 @@
+"""
+Measure how long `import main` takes in a fresh interpreter, using
+`python -X importtime`, and check it against a budget.
+
+Run from the repository root:
+
+    python -m benchmarks.import_time [runs] [budget_ms]
+
+The fastest of `runs` imports is compared with `budget_ms`
+(IMPORT_TIME_BUDGET_MS by default), as it is the least affected by
+other load on the machine. The script exits with status 1 when
+the budget is exceeded or when one of LAZY_MODULES got imported eagerly,
+so it can guard releases in CI.
+"""
+
+import statistics
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET_MS = 900
+
+# integrations which must only be loaded on first use; redis is not listed,
+# the rate limiter connects its Redis storage when the routers are defined
+LAZY_MODULES = (
+    "cloudinary",
+    "fastapi_mail",
+    "jose",
+    "passlib",
+    "bcrypt",
+    "jinja2",
+)
+
+TOP_MODULES = 15
+
+
+def import_times(module: str = "main") -> dict[str, tuple[int, int]]:
+    """
+    Import `module` in a fresh interpreter.
+
+    Returns:
+        Imported module names mapped to their self and cumulative
+        import time in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def eager_modules(times: dict[str, tuple[int, int]]) -> list[str]:
+    return [name for name in LAZY_MODULES if name in times]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    budget_ms = float(sys.argv[2]) if len(sys.argv) > 2 else IMPORT_TIME_BUDGET_MS
+
+    samples = [import_times() for _ in range(runs)]
+    totals_ms = [times["main"][1] / 1000 for times in samples]
+    best_ms = min(totals_ms)
+
+    last = samples[-1]
+    print(f"{'module':<50}{'self ms':>10}{'cumulative ms':>16}")
+    top = sorted(last.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_us, cumulative_us) in top[:TOP_MODULES]:
+        print(f"{name:<50}{self_us / 1000:>10.1f}{cumulative_us / 1000:>16.1f}")
+    print()
+    print(
+        f"import main: best {best_ms:.1f} ms over {runs} runs "
+        f"(median {statistics.median(totals_ms):.1f}, max {max(totals_ms):.1f}), "
+        f"{len(last)} modules, budget {budget_ms:.0f} ms"
+    )
+
+    failed = False
+    eager = eager_modules(last)
+    if eager:
+        print(f"FAIL: imported eagerly: {', '.join(eager)}")
+        failed = True
+    if best_ms > budget_ms:
+        print(f"FAIL: {best_ms:.1f} ms is over the budget of {budget_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Measure the CPU cost and size reduction of compressing contact list pages
+with gzip and brotli at several levels.
+
+Run from the repository root:
+
+    python -m benchmarks.response_compression [iterations]
+"""
+
+import sys
+import time
+from datetime import date, datetime
+
+from src.api.compression import BrotliEncoder, GzipEncoder
+from src.api.responses import serialize_rows
+
+PAGE_SIZES = (10, 100, 1_000)
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 4, 11)
+
+
+def create_page(count: int) -> bytes:
+    rows = [
+        {
+            "id": i,
+            "first_name": f"John{i}",
+            "last_name": "Doe",
+            "email": f"john{i}@doe.me",
+            "phone": f"034 434 {i % 100:02} 54",
+            "date_of_birth": date(1990, 1 + i % 12, 1 + i % 28),
+            "info": "Benchmark contact",
+            "created_at": datetime(2025, 1, 1, 12, i % 60),
+        }
+        for i in range(count)
+    ]
+    return serialize_rows(rows).body
+
+
+def measure(create_encoder, body: bytes, iterations: int) -> tuple[float, int]:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encoder = create_encoder()
+        compressed = encoder.compress(body) + encoder.finish()
+    return (time.perf_counter() - start) / iterations, len(compressed)
+
+
+def main(iterations: int):
+    encoders = [(f"gzip-{level}", GzipEncoder, level) for level in GZIP_LEVELS]
+    encoders += [
+        (f"br-{quality}", BrotliEncoder, quality) for quality in BROTLI_QUALITIES
+    ]
+
+    print(f"{'rows':>6}{'encoding':>10}{'bytes':>10}{'ratio':>8}{'ms':>9}{'MB/s':>9}")
+    for size in PAGE_SIZES:
+        body = create_page(size)
+        print(f"{size:>6}{'identity':>10}{len(body):>10}{1:>8.2f}{0:>9.3f}{'':>9}")
+        repeat = max(1, iterations * PAGE_SIZES[0] // size)
+        for name, encoder_class, level in encoders:
+            seconds, length = measure(lambda: encoder_class(level), body, repeat)
+            print(
+                f"{size:>6}{name:>10}{length:>10}{length / len(body):>8.2f}"
+                f"{seconds * 1000:>9.3f}{len(body) / seconds / 1e6:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -1,17 +1,51 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from src.api import contacts, auth, users, admin_dashboard
-from slowapi import Limiter
+from src.api import contacts, auth, users, admin_dashboard, metrics
 from slowapi.errors import RateLimitExceeded
-from slowapi.util import get_remote_address
 from starlette.responses import JSONResponse
+from src.services.email import close_mail_client
+from src.database.db import sessionmanager
+from src.services.upload_file import close_avatar_storage
+from src.api.responses import FastJSONResponse
+from src.api.compression import CompressionMiddleware
+from src.api.server_timing import ServerTimingMiddleware
+from src.api.tracing import TracingMiddleware
+from src.api.profiler import ProfilerMiddleware
+from src.services.tracing import tracer
+from src.conf.config import settings
+from src.services.rate_limit import limiter
+from src.services.metrics import clear_snapshots, registry
 
 origins = ["<http://localhost:3000>"]
-limiter = Limiter(key_func=get_remote_address)
 
-app = FastAPI()
-app.mount("/static", StaticFiles(directory="static"), name="static")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sessionmanager.init()
+    yield
+    await close_mail_client()
+    await sessionmanager.close()
+    close_avatar_storage()
+    tracer.exporter.close()
+    registry.close()
+
+
+class CachedStaticFiles(StaticFiles):
+    """Static files where content-addressed avatars are cached forever."""
+
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if path.startswith("avatars/") and response.status_code == 200:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+app.state.limiter = limiter
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 
 @app.exception_handler(RateLimitExceeded)
@@ -26,19 +60,85 @@ app.include_router(contacts.router, prefix="/api")
 app.include_router(auth.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
 app.include_router(admin_dashboard.router)
+app.include_router(metrics.router)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Before-Id"],
+)
+app.add_middleware(
+    ServerTimingMiddleware,
+    query_budget=settings.SQL_QUERY_BUDGET,
+    repeat_threshold=settings.SQL_REPEAT_THRESHOLD,
 )
+app.add_middleware(
+    ProfilerMiddleware,
+    directory=settings.PROFILE_DIR,
+    interval=settings.PROFILE_INTERVAL,
+    keep=settings.PROFILE_MAX_FILES,
+)
+app.add_middleware(
+    TracingMiddleware, tracer=tracer, trusted_hosts=settings.TRACE_TRUSTED_HOSTS
+)
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+def run(argv: list[str] | None = None):
+    """
+    Serve the app with uvicorn.
 
+    By default runs the production setup from the SERVER_* settings: several
+    worker processes, uvloop and httptools when installed, and workers
+    recycled after SERVER_MAX_REQUESTS requests. Pass --reload for a single
+    auto-reloading development server.
+    """
+    import argparse
+    import os
+    import tempfile
 
-def run():
     import uvicorn
 
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    parser = argparse.ArgumentParser(description="Run the contacts API server")
+    parser.add_argument(
+        "--reload", action="store_true", help="development mode with auto reload"
+    )
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS)
+    args = parser.parse_args(argv)
+
+    if args.reload:
+        uvicorn.run("main:app", host=args.host, port=args.port, reload=True)
+        return
+
+    # workers are spawned with this environment and share the directory
+    metrics_dir = settings.METRICS_DIR or tempfile.mkdtemp(prefix="contacts-metrics-")
+    clear_snapshots(metrics_dir)
+    os.environ["METRICS_DIR"] = metrics_dir
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=settings.SERVER_LOOP,
+        http=settings.SERVER_HTTP,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        limit_max_requests=settings.SERVER_MAX_REQUESTS or None,
+        access_log=settings.SERVER_ACCESS_LOG,
+        proxy_headers=True,
+    )
 
 
 if __name__ == "__main__":
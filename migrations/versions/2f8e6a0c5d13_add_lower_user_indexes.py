@@ -0,0 +1,62 @@
+"""Add case-insensitive user indexes
+
+Usernames and emails become unique regardless of letter case, and login
+looks the username up case-insensitively. Existing users which differ only
+in letter case must be merged or renamed first, the upgrade stops with
+a list of them otherwise.
+
+Revision ID: 2f8e6a0c5d13
+Revises: 9c3b1d7e2a41
+Create Date: 2026-10-19 11:02:47.905112
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "2f8e6a0c5d13"
+down_revision: Union[str, Sequence[str], None] = "9c3b1d7e2a41"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def check_case_duplicates(column: str):
+    if context.is_offline_mode():
+        return
+    duplicates = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                f"SELECT lower({column}) FROM users GROUP BY lower({column}) "
+                "HAVING count(*) > 1 ORDER BY 1 LIMIT 20"
+            )
+        )
+        .scalars()
+        .all()
+    )
+    if duplicates:
+        raise RuntimeError(
+            f"Users with the same {column} in different letter case: "
+            f"{', '.join(duplicates)}. Merge or rename them before upgrading."
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    check_case_duplicates("username")
+    check_case_duplicates("email")
+    op.create_index(
+        "ix_users_username_lower", "users", [sa.text("lower(username)")], unique=True
+    )
+    op.create_index(
+        "ix_users_email_lower", "users", [sa.text("lower(email)")], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_email_lower", table_name="users")
+    op.drop_index("ix_users_username_lower", table_name="users")
@@ -0,0 +1,39 @@
+"""Add contact counters
+
+Revision ID: 9c3b1d7e2a41
+Revises: 5ef5502d4230
+Create Date: 2026-10-19 10:12:31.418220
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "9c3b1d7e2a41"
+down_revision: Union[str, Sequence[str], None] = "5ef5502d4230"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "contact_counters",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.execute(
+        "INSERT INTO contact_counters (user_id, total) "
+        "SELECT user_id, count(*) FROM contacts "
+        "WHERE user_id IS NOT NULL GROUP BY user_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("contact_counters")
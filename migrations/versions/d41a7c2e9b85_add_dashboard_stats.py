@@ -0,0 +1,72 @@
+"""Add dashboard stats
+
+Revision ID: d41a7c2e9b85
+Revises: b7d40e9f1c28
+Create Date: 2026-10-19 16:02:47.512093
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "d41a7c2e9b85"
+down_revision: Union[str, Sequence[str], None] = "b7d40e9f1c28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# same as CONTACTS_PER_USER_BUCKETS in src/repository/stats.py at this revision
+CONTACTS_PER_USER_BUCKETS = (0, 1, 10, 50, 100, 500, 1000)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "stat_counters",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("value", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    op.create_table(
+        "daily_stats",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("shard", sa.Integer(), nullable=False),
+        sa.Column("signups", sa.Integer(), nullable=False),
+        sa.Column("contacts_created", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "shard"),
+    )
+
+    # one-off backfill, afterwards the tables are maintained by repository writes
+    op.execute(
+        "INSERT INTO stat_counters (name, value) "
+        "SELECT 'users', count(*) FROM users "
+        "UNION ALL "
+        "SELECT 'confirmed_users', count(*) FROM users WHERE confirmed"
+    )
+    bucket = " ".join(
+        f"WHEN coalesce(c.total, 0) >= {lower} THEN 'contacts_per_user:{lower}'"
+        for lower in reversed(CONTACTS_PER_USER_BUCKETS)
+    )
+    op.execute(
+        "INSERT INTO stat_counters (name, value) "
+        f"SELECT CASE {bucket} END AS name, count(*) FROM users u "
+        "LEFT JOIN contact_counters c ON c.user_id = u.id GROUP BY name"
+    )
+    op.execute(
+        "INSERT INTO daily_stats (day, shard, signups, contacts_created) "
+        "SELECT day, 0, sum(signups), sum(contacts_created) FROM ("
+        "SELECT CAST(created_at AS DATE) AS day, 1 AS signups, 0 AS contacts_created "
+        "FROM users WHERE created_at IS NOT NULL "
+        "UNION ALL "
+        "SELECT CAST(created_at AS DATE), 0, 1 "
+        "FROM contacts WHERE created_at IS NOT NULL"
+        ") AS activity GROUP BY day"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("daily_stats")
+    op.drop_table("stat_counters")
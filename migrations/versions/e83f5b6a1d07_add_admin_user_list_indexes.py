@@ -0,0 +1,40 @@
+"""Add admin user list indexes
+
+Revision ID: e83f5b6a1d07
+Revises: d41a7c2e9b85
+Create Date: 2026-10-19 17:24:09.871342
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e83f5b6a1d07"
+down_revision: Union[str, Sequence[str], None] = "d41a7c2e9b85"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_users_username_prefix",
+        "users",
+        [sa.text("lower(username) text_pattern_ops")],
+    )
+    op.create_index(
+        "ix_users_email_prefix", "users", [sa.text("lower(email) text_pattern_ops")]
+    )
+    op.create_index("ix_users_role_confirmed_id", "users", ["role", "confirmed", "id"])
+    op.create_index("ix_users_created_at_id", "users", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_created_at_id", table_name="users")
+    op.drop_index("ix_users_role_confirmed_id", table_name="users")
+    op.drop_index("ix_users_email_prefix", table_name="users")
+    op.drop_index("ix_users_username_prefix", table_name="users")
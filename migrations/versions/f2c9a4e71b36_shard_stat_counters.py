@@ -0,0 +1,42 @@
+"""Shard stat counters
+
+Revision ID: f2c9a4e71b36
+Revises: e83f5b6a1d07
+Create Date: 2026-10-19 21:12:35.204817
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "f2c9a4e71b36"
+down_revision: Union[str, Sequence[str], None] = "e83f5b6a1d07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing totals stay in shard 0, new writes go to the shard of the user
+    op.add_column(
+        "stat_counters",
+        sa.Column("shard", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.alter_column("stat_counters", "shard", server_default=None)
+    op.drop_constraint("stat_counters_pkey", "stat_counters", type_="primary")
+    op.create_primary_key("stat_counters_pkey", "stat_counters", ["name", "shard"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "INSERT INTO stat_counters (name, shard, value) "
+        "SELECT name, -1, sum(value) FROM stat_counters GROUP BY name"
+    )
+    op.execute("DELETE FROM stat_counters WHERE shard <> -1")
+    op.drop_constraint("stat_counters_pkey", "stat_counters", type_="primary")
+    op.drop_column("stat_counters", "shard")
+    op.create_primary_key("stat_counters_pkey", "stat_counters", ["name"])
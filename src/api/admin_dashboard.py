@@ -1,19 +1,225 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List
-from src.database.models import User
+import os
+import tracemalloc
+
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from typing import List, Literal
+from datetime import datetime
+from src.database.models import User, UserRole
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.schemas import ContactModel, ContactModelResponse
+from src.schemas import ContactModel, ContactModelResponse, UserListItem
 from src.database.db import get_db
-from src.services.contacts import ContactService
+from src.database.cache import Cache, get_cache
+from src.services.dashboard import DashboardService
+from src.services.users import UserService
+from src.api.responses import serialize_rows
 from src.services.auth import get_current_admin_user
+from src.services.email_outbox import EmailOutboxService
+from src.services.profiler import list_profiles, profiling_session
+from src.services.memory import gc_stats, memory_diagnostics
+from src.conf.config import settings
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
-@router.get("/dashboard")
+@router.get(
+    "/dashboard",
+    description="Users, contacts per user and daily activity for the last "
+    "DASHBOARD_DAYS days, read from summary tables and cached for "
+    "DASHBOARD_CACHE_TTL seconds.",
+)
 async def get_dashboard(
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    cache: Cache = Depends(get_cache),
+    user: User = Depends(get_current_admin_user),
+):
+    dashboard_service = DashboardService(db, cache)
+    response.headers["Cache-Control"] = (
+        f"private, max-age={settings.DASHBOARD_CACHE_TTL}"
+    )
+    return await dashboard_service.get_dashboard()
+
+
+@router.get(
+    "/users",
+    response_model=List[UserListItem],
+    description="Users, newest first. When more users may follow, the "
+    "`X-Next-Before-Id` header holds the `before_id` of the next page. "
+    "`search` is a case-insensitive prefix of the username or email.",
+)
+async def get_users(
+    limit: int = Query(50, ge=1, le=500),
+    before_id: int | None = None,
+    role: UserRole | None = None,
+    confirmed: bool | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    search: str | None = Query(None, min_length=1, max_length=100),
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_admin_user),
 ):
-    contact_service = ContactService(db)
-    return {"message": "This is secret dashboard"}
+    user_service = UserService(db)
+    users = await user_service.list_user_rows(
+        limit,
+        before_id,
+        role=role,
+        confirmed=confirmed,
+        created_from=created_from,
+        created_to=created_to,
+        search=search,
+    )
+    headers = {}
+    if len(users) == limit:
+        headers["X-Next-Before-Id"] = str(users[-1]["id"])
+    return serialize_rows(users, headers)
+
+
+@router.get(
+    "/email_outbox",
+    description="Queue depth and delivery latency of the email outbox, in seconds.",
+)
+async def get_email_outbox_stats(
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_admin_user),
+):
+    email_outbox_service = EmailOutboxService(db)
+    return await email_outbox_service.get_stats()
+
+
+@router.post(
+    "/profiler/session",
+    description="Profile all threads of the worker which handles this request "
+    "for `seconds`, the result is stored as a collapsed stacks file.",
+)
+async def start_profiling_session(
+    seconds: float = Query(30, gt=0, le=settings.PROFILE_MAX_SECONDS),
+    mode: Literal["wall", "cpu"] = "wall",
+    user: User = Depends(get_current_admin_user),
+):
+    if profiling_session.running:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Profiling session is already running",
+        )
+    profiling_session.start(
+        seconds,
+        mode,
+        settings.PROFILE_INTERVAL,
+        settings.PROFILE_DIR,
+        settings.PROFILE_MAX_FILES,
+    )
+    return profiling_session.status()
+
+
+@router.get("/profiler/session")
+async def get_profiling_session(user: User = Depends(get_current_admin_user)):
+    return profiling_session.status()
+
+
+@router.get("/profiler/profiles")
+async def get_profiles(user: User = Depends(get_current_admin_user)):
+    return list_profiles(settings.PROFILE_DIR)
+
+
+@router.get("/profiler/profiles/{name}")
+async def get_profile(name: str, user: User = Depends(get_current_admin_user)):
+    path = os.path.join(settings.PROFILE_DIR, os.path.basename(name))
+    if not name.endswith(".collapsed") or not os.path.isfile(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return FileResponse(path, media_type="text/plain")
+
+
+MemoryKeyType = Literal["lineno", "filename", "traceback"]
+
+
+def snapshot_not_found():
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Snapshot not found on worker {os.getpid()}",
+    )
+
+
+@router.post(
+    "/memory/tracemalloc/start",
+    description="Start tracing allocations of this worker, keeping `frames` "
+    "frames per allocation. Tracing and snapshots are per worker: send the "
+    "following memory requests to the worker with the returned `pid`.",
+)
+async def start_tracemalloc(
+    frames: int = Query(25, ge=1, le=100),
+    user: User = Depends(get_current_admin_user),
+):
+    return memory_diagnostics.start(frames)
+
+
+@router.post("/memory/tracemalloc/stop")
+async def stop_tracemalloc(user: User = Depends(get_current_admin_user)):
+    return memory_diagnostics.stop()
+
+
+@router.get("/memory/tracemalloc")
+async def get_tracemalloc_status(user: User = Depends(get_current_admin_user)):
+    return memory_diagnostics.status()
+
+
+@router.post(
+    "/memory/snapshots",
+    status_code=status.HTTP_201_CREATED,
+    description="Snapshot traced allocations of the worker with the returned "
+    "`pid`; only that worker can show or diff the snapshot.",
+)
+async def take_memory_snapshot(user: User = Depends(get_current_admin_user)):
+    if not tracemalloc.is_tracing():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="tracemalloc is not started",
+        )
+    return await run_in_threadpool(memory_diagnostics.take_snapshot)
+
+
+@router.get("/memory/snapshots/{snapshot_id}/top")
+async def get_memory_top(
+    snapshot_id: int,
+    key_type: MemoryKeyType = "lineno",
+    limit: int = Query(20, ge=1, le=500),
+    user: User = Depends(get_current_admin_user),
+):
+    top = await run_in_threadpool(memory_diagnostics.top, snapshot_id, key_type, limit)
+    if top is None:
+        raise snapshot_not_found()
+    return top
+
+
+@router.get(
+    "/memory/snapshots/{snapshot_id}/diff/{base_id}",
+    description="Allocation sites which grew the most since snapshot `base_id`.",
+)
+async def get_memory_diff(
+    snapshot_id: int,
+    base_id: int,
+    key_type: MemoryKeyType = "lineno",
+    limit: int = Query(20, ge=1, le=500),
+    user: User = Depends(get_current_admin_user),
+):
+    diff = await run_in_threadpool(
+        memory_diagnostics.diff, snapshot_id, base_id, key_type, limit
+    )
+    if diff is None:
+        raise snapshot_not_found()
+    return diff
+
+
+@router.get(
+    "/memory/gc",
+    description="Garbage collector statistics and the most common types "
+    "of live objects of this worker.",
+)
+async def get_gc_stats(
+    limit: int = Query(50, ge=1, le=1000),
+    user: User = Depends(get_current_admin_user),
+):
+    return await run_in_threadpool(gc_stats, limit)
@@ -3,56 +3,56 @@ from fastapi import (
     Depends,
     HTTPException,
     status,
-    BackgroundTasks,
     Request,
     Form,
 )
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
-from fastapi.templating import Jinja2Templates
 from src.schemas import UserCreate, Token, User, RequestEmail
 from src.services.auth import create_access_token, Hash, get_email_from_token
 from src.services.users import UserService
 from src.database.db import get_db
-from src.services.email import send_confirm_email, send_reset_email
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from src.database.cache import Cache, get_cache
+from src.services.rate_limit import limit_description, rate_limit
 from typing import Annotated
-
+from functools import cache
 
 router = APIRouter(prefix="/auth", tags=["auth"])
-limiter = Limiter(key_func=get_remote_address)
-templates = Jinja2Templates(directory="templates")
+
+
+@cache
+def get_templates():
+    # jinja2 is imported when the first page is rendered
+    from fastapi.templating import Jinja2Templates
+
+    return Jinja2Templates(directory="templates")
 
 
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
 async def register_user(
     user_data: UserCreate,
-    background_tasks: BackgroundTasks,
     request: Request,
     db: Session = Depends(get_db),
+    cache: Cache = Depends(get_cache),
 ):
-    user_service = UserService(db)
+    user_service = UserService(db, cache)
 
-    email_user = await user_service.get_user_by_email(user_data.email)
-    if email_user:
+    # checked before hashing, so repeated signups don't cost a bcrypt round;
+    # the unique indexes still catch a concurrent signup of the same user
+    if await user_service.user_exists(user_data.username, user_data.email):
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="User already exists",
         )
-
-    username_user = await user_service.get_user_by_username(user_data.username)
-    if username_user:
+    user_data.password = Hash().get_password_hash(user_data.password)
+    try:
+        new_user = await user_service.create_user(user_data, str(request.base_url))
+    except IntegrityError:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="User already exists",
         )
-    user_data.password = Hash().get_password_hash(user_data.password)
-    new_user = await user_service.create_user(user_data)
-
-    background_tasks.add_task(
-        send_confirm_email, new_user.email, new_user.username, request.base_url
-    )
     return new_user
 
 
@@ -96,47 +96,44 @@ async def confirmed_email(token: str, db: Session = Depends(get_db)):
 @router.post("/request_email")
 async def request_email(
     body: RequestEmail,
-    background_tasks: BackgroundTasks,
     request: Request,
     db: Session = Depends(get_db),
+    cache: Cache = Depends(get_cache),
 ):
-    user_service = UserService(db)
+    user_service = UserService(db, cache)
     user = await user_service.get_user_by_email(body.email)
 
+    if user is None:
+        return {"message": "Check your email"}
     if user.confirmed:
         return {"message": "Email already confirmed"}
-    if user:
-        background_tasks.add_task(
-            send_confirm_email, user.email, user.username, request.base_url
-        )
+    await user_service.request_confirm_email(user, str(request.base_url))
     return {"message": "Check your email"}
 
 
 @router.post("/request_reset_password")
 async def request_reset_password(
     body: RequestEmail,
-    background_tasks: BackgroundTasks,
     request: Request,
     db: Session = Depends(get_db),
+    cache: Cache = Depends(get_cache),
 ):
-    user_service = UserService(db)
+    user_service = UserService(db, cache)
     user = await user_service.get_user_by_email(body.email)
 
     if user is not None:
-        background_tasks.add_task(
-            send_reset_email, user.email, user.username, request.base_url
-        )
+        await user_service.request_reset_email(user, str(request.base_url))
 
     return {"message": "Check your email"}
 
 
 @router.get(
     "/password_reset/{token}",
-    description="No more than 10 requests per minute",
+    description=limit_description("password_reset_page"),
 )
-@limiter.limit("10/minute")
+@rate_limit("password_reset_page")
 async def get_password_reset_page(request: Request):
-    return templates.TemplateResponse(request, "reset_password_form.html")
+    return get_templates().TemplateResponse(request, "reset_password_form.html")
 
 
 @router.post(
@@ -1,33 +1,83 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi.responses import StreamingResponse
+from typing import List, Literal
 from src.database.models import User
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.schemas import ContactModel, ContactModelResponse
+from src.schemas import (
+    ContactModel,
+    ContactModelResponse,
+    ContactProjection,
+    ContactBatchDelete,
+    ContactBatchUpdate,
+    ContactBatchResult,
+    ContactIds,
+    ContactMultiGetResult,
+)
 from src.database.db import get_db
 from src.services.contacts import ContactService
 from src.services.auth import get_current_user
+from src.services.export import contacts_to_csv, contacts_to_ndjson
+from src.repository.contacts import CONTACT_FIELDS
+from src.api.responses import serialize_response, serialize_rows
+from pydantic import TypeAdapter
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 
+multi_get_result = TypeAdapter(ContactMultiGetResult)
+
+FIELDS_DESCRIPTION = (
+    "Comma separated list of fields to return, one or more of: "
+    + ", ".join(CONTACT_FIELDS)
+    + ". All fields are returned by default."
+)
+
+
+def get_fields(
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+) -> List[str] | None:
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",")))
+    unknown = [name for name in names if name not in CONTACT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}",
+        )
+    return names
 
-@router.get("/", response_model=List[ContactModelResponse])
+
+@router.get(
+    "/",
+    response_model=List[ContactProjection],
+    description="Pass `with_total=true` to receive the total number of contacts "
+    "in the `X-Total-Count` header.",
+)
 async def get_contacts(
     skip: int = 0,
     limit: int = 100,
+    with_total: bool = False,
+    fields: List[str] | None = Depends(get_fields),
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
     contact_service = ContactService(db)
-    return await contact_service.get_contacts(skip, limit, user)
+    headers = {}
+    if with_total:
+        total = await contact_service.count_contacts(user)
+        headers["X-Total-Count"] = str(total)
+    contacts = await contact_service.get_contact_rows(skip, limit, user, fields)
+    return serialize_rows(contacts, headers)
 
 
-@router.get("/search", response_model=List[ContactModelResponse])
+@router.get("/search", response_model=List[ContactProjection])
 async def search_contacts(
     first_name: str | None = None,
     last_name: str | None = None,
     email: str | None = None,
     skip: int = 0,
     limit: int = 100,
+    fields: List[str] | None = Depends(get_fields),
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
@@ -37,18 +87,78 @@ async def search_contacts(
             detail="At least one search query should be presented",
         )
     contact_service = ContactService(db)
-    return await contact_service.search_contacts(
-        first_name, last_name, email, skip, limit, user
+    contacts = await contact_service.search_contact_rows(
+        first_name, last_name, email, skip, limit, user, fields
     )
+    return serialize_rows(contacts)
 
 
-@router.get("/closest_birthdays", response_model=List[ContactModelResponse])
+@router.get("/closest_birthdays", response_model=List[ContactProjection])
 async def get_closest_birthdays_contacts(
+    fields: List[str] | None = Depends(get_fields),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    contact_service = ContactService(db)
+    contacts = await contact_service.get_closest_birthday_rows(user, fields)
+    return serialize_rows(contacts)
+
+
+@router.get(
+    "/by_ids",
+    response_model=ContactMultiGetResult,
+    description="Get several contacts at once, in the order of `ids`. "
+    "Ids of contacts that were not found are listed in `missing`.",
+)
+async def get_contacts_by_ids(
+    ids: List[int] = Query(max_length=1000),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    contact_service = ContactService(db)
+    result = await contact_service.get_contacts_by_ids(ids, user)
+    return serialize_response(multi_get_result, result)
+
+
+@router.post(
+    "/by_ids",
+    response_model=ContactMultiGetResult,
+    description="Same as GET /contacts/by_ids, for id lists too long for a query string.",
+)
+async def post_contacts_by_ids(
+    body: ContactIds,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    contact_service = ContactService(db)
+    result = await contact_service.get_contacts_by_ids(body.ids, user)
+    return serialize_response(multi_get_result, result)
+
+
+@router.get(
+    "/export",
+    description="Stream all contacts as NDJSON or CSV. "
+    "Pass the last received id as `after_id` to resume an interrupted export.",
+)
+async def export_contacts(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    after_id: int = 0,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
     contact_service = ContactService(db)
-    return await contact_service.get_closest_brithday_contacts(user)
+    contacts = contact_service.stream_contacts(user, after_id)
+
+    if format == "csv":
+        body, media_type = contacts_to_csv(contacts), "text/csv"
+    else:
+        body, media_type = contacts_to_ndjson(contacts), "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
+    )
 
 
 @router.get("/{contact_id}", response_model=ContactModelResponse)
@@ -80,6 +190,48 @@ async def create_contact(
     return await contact_service.create_contact(body, user)
 
 
+def validate_batch_selection(body: ContactBatchDelete):
+    has_filter = body.filter is not None and body.filter.model_dump(exclude_none=True)
+    if body.ids is None and not has_filter:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either ids or filter should be presented",
+        )
+
+
+@router.post("/batch_update", response_model=ContactBatchResult)
+async def update_contacts(
+    body: ContactBatchUpdate,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    validate_batch_selection(body)
+    if not body.values.model_dump(exclude_unset=True, exclude_none=True):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one value to update should be presented",
+        )
+
+    contact_service = ContactService(db)
+    ids = await contact_service.update_contacts(
+        body.ids, body.filter, body.values, user
+    )
+    return {"ids": ids}
+
+
+@router.post("/batch_delete", response_model=ContactBatchResult)
+async def delete_contacts(
+    body: ContactBatchDelete,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    validate_batch_selection(body)
+
+    contact_service = ContactService(db)
+    ids = await contact_service.delete_contacts(body.ids, body.filter, user)
+    return {"ids": ids}
+
+
 @router.delete("/{contact_id}", response_model=ContactModelResponse)
 async def delete_contact(
     contact_id: int,
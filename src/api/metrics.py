@@ -0,0 +1,103 @@
+import secrets
+import time
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf.config import settings
+from src.database.cache import Cache, get_cache
+from src.database.db import get_db
+from src.services.email_outbox import EmailOutboxService
+from src.services.metrics import (
+    Gauge,
+    http_request_duration,
+    http_requests,
+    registry,
+)
+
+router = APIRouter(tags=["metrics"])
+
+
+class MetricsMiddleware:
+    """
+    Record latency and status of every request, labeled by route template
+    rather than by path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry.start()
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            http_requests.inc(method, route, str(status_code))
+            http_request_duration.observe(
+                method, route, value=time.perf_counter() - start
+            )
+
+
+def verify_metrics_token(authorization: str = Header(default="")):
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        token.encode(), settings.METRICS_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+    dependencies=[Depends(verify_metrics_token)],
+)
+async def metrics(
+    db: AsyncSession = Depends(get_db), cache: Cache = Depends(get_cache)
+):
+    # the queue lives in the database, so it is read once per scrape
+    # instead of being summed over workers
+    queued, failed, oldest_age = await EmailOutboxService(db, cache).get_queue_depth()
+    email_outbox = Gauge(
+        "email_outbox_emails", "Emails in the outbox by status.", ("status",)
+    )
+    email_outbox.set("queued", value=queued)
+    email_outbox.set("failed", value=failed)
+    email_outbox_age = Gauge(
+        "email_outbox_oldest_queued_seconds", "Age of the oldest queued email."
+    )
+    email_outbox_age.set(value=oldest_age)
+
+    # snapshots are written and read from disk, away from the event loop
+    text = await run_in_threadpool(
+        registry.render, extra=[email_outbox, email_outbox_age]
+    )
+    return PlainTextResponse(
+        text,
+        media_type="text/plain; version=0.0.4",
+    )
@@ -0,0 +1,148 @@
+import logging
+import threading
+from typing import Awaitable, Callable
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.database.cache import get_cache
+from src.database.db import get_db
+from src.database.models import UserRole
+from src.services.auth import get_current_user
+from src.services.profiler import (
+    PROFILE_MODES,
+    SamplingProfiler,
+    profile_file_name,
+    save_profile,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def is_admin_request(scope: Scope) -> bool:
+    """
+    Check that the request carries the bearer token of an admin.
+
+    The session and the cache come from the dependency overrides of the app,
+    like in the routes. When the database or the cache is unavailable the
+    request is served without profiling instead of failing.
+    """
+    scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+
+    overrides = getattr(scope.get("app"), "dependency_overrides", {})
+    sessions = overrides.get(get_db, get_db)()
+    try:
+        db = await anext(sessions)
+        cache = overrides.get(get_cache, get_cache)()
+        user = await get_current_user(Request(scope), token, db, cache)
+    except HTTPException:
+        return False
+    except (SQLAlchemyError, RedisError, OSError):
+        logger.warning("Can't check profiling access", exc_info=True)
+        return False
+    finally:
+        await sessions.aclose()
+    return user.role == UserRole.ADMIN
+
+
+class ProfilerMiddleware:
+    """
+    Profile single requests of admin users.
+
+    A request is profiled when it has an `X-Profile: wall|cpu` header or a
+    `profile=wall|cpu` query parameter and is made by an admin. The collapsed
+    stacks are stored in PROFILE_DIR, which keeps the newest `keep` files,
+    and the file name is returned in the X-Profile-File header; with
+    `X-Profile-Output: response` (or the `profile_output=response` query
+    parameter) they are returned instead of a successful response, other
+    responses are sent unchanged.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        directory: str,
+        interval: float,
+        keep: int | None = None,
+        authorize: Callable[[Scope], Awaitable[bool]] = is_admin_request,
+    ):
+        self.app = app
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self.authorize = authorize
+
+    @staticmethod
+    def requested(scope: Scope) -> tuple[str | None, str]:
+        headers = Headers(scope=scope)
+        query = parse_qs(scope.get("query_string", b"").decode())
+        mode = headers.get("x-profile") or query.get("profile", [None])[0]
+        output = (
+            headers.get("x-profile-output") or query.get("profile_output", ["file"])[0]
+        )
+        return mode, output
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode, output = self.requested(scope)
+        if mode not in PROFILE_MODES or not await self.authorize(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = SamplingProfiler([threading.get_ident()], self.interval, mode)
+        label = f"{scope['method']} {scope['path']}"
+
+        if output == "response":
+            messages = []
+
+            async def collect(message: Message):
+                messages.append(message)
+
+            profiler.start()
+            try:
+                await self.app(scope, receive, collect)
+            finally:
+                profiler.stop()
+            if not 200 <= messages[0]["status"] < 300:
+                for message in messages:
+                    await send(message)
+                return
+            body = profiler.collapsed().encode()
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"text/plain; charset=utf-8"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"x-profile-samples", str(profiler.samples).encode()),
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        name = profile_file_name(mode, label)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-File", name)
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await run_in_threadpool(
+                save_profile, self.directory, profiler.stop(), label, name, self.keep
+            )
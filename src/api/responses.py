@@ -0,0 +1,57 @@
+from typing import Any, List
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+from src.services.tracing import span
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Default response class, renders content straight to compact JSON bytes
+    with pydantic-core instead of the stdlib encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+def serialize_response(
+    adapter: TypeAdapter, content: Any, headers: dict | None = None
+) -> Response:
+    """
+    Validate ORM objects with `adapter` and dump them to JSON bytes.
+
+    Both steps run inside pydantic-core, which skips FastAPI's own
+    response_model validation and jsonable_encoder pass for large lists.
+
+    Args:
+        adapter: Type adapter of the response model.
+        content: Objects to serialize, read by attribute.
+        headers: Extra response headers.
+
+    Returns:
+        Response with a pre-rendered JSON body.
+    """
+    with span("serialize"):
+        body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def serialize_rows(rows: List[dict], headers: dict | None = None) -> Response:
+    """
+    Dump plain rows selected by the read-only repository queries to JSON bytes.
+
+    The rows come straight from typed table columns, so they are not validated.
+
+    Args:
+        rows: Dicts of column values.
+        headers: Extra response headers.
+
+    Returns:
+        Response with a pre-rendered JSON body.
+    """
+    with span("serialize", rows=len(rows)):
+        body = to_json(rows)
+    return Response(body, media_type="application/json", headers=headers)
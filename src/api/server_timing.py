@@ -0,0 +1,58 @@
+import logging
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.services.request_timing import RequestTimings, current_timings
+
+logger = logging.getLogger(__name__)
+
+
+class ServerTimingMiddleware:
+    """
+    Collect db, cache and auth timings of each request, report them in the
+    Server-Timing header and warn about requests which run too many queries
+    or repeat the same statement, a sign of N+1 queries.
+    """
+
+    def __init__(self, app: ASGIApp, query_budget: int, repeat_threshold: int):
+        self.app = app
+        self.query_budget = query_budget
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_timings.reset(token)
+            self.check(scope, timings)
+
+    def check(self, scope: Scope, timings: RequestTimings):
+        request = f"{scope['method']} {scope['path']}"
+        if timings.queries > self.query_budget:
+            logger.warning(
+                "%s ran %s SQL statements, budget is %s",
+                request,
+                timings.queries,
+                self.query_budget,
+            )
+        for statement, count in timings.repeated_statements(self.repeat_threshold):
+            logger.warning(
+                "%s repeated the same SQL statement %s times: %s",
+                request,
+                count,
+                " ".join(statement.split())[:200],
+            )
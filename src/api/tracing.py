@@ -0,0 +1,61 @@
+from typing import Iterable
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.services.tracing import Tracer, current_span
+
+
+class TracingMiddleware:
+    """
+    Open a root span for sampled requests.
+
+    The sampling decision and trace id of an upstream service are taken from
+    B3 headers only when the request comes from one of `trusted_hosts`, so
+    traces continue across services but arbitrary clients can't force
+    tracing. The trace id of a sampled request is returned in the
+    X-B3-TraceId header.
+    """
+
+    def __init__(self, app: ASGIApp, tracer: Tracer, trusted_hosts: Iterable[str] = ()):
+        self.app = app
+        self.tracer = tracer
+        self.trusted_hosts = frozenset(trusted_hosts)
+
+    def is_trusted(self, scope: Scope) -> bool:
+        client = scope.get("client")
+        return client is not None and client[0] in self.trusted_hosts
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope) if self.is_trusted(scope) else Headers()
+        if not self.tracer.should_sample(headers.get("x-b3-sampled")):
+            await self.app(scope, receive, send)
+            return
+
+        root = self.tracer.start_trace(
+            f"{scope['method']} {scope['path']}",
+            headers.get("x-b3-traceid"),
+            headers.get("x-b3-spanid"),
+        )
+        root.set_tag("http.method", scope["method"])
+        root.set_tag("http.path", scope["path"])
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                root.set_tag("http.status_code", message["status"])
+                MutableHeaders(scope=message).append("X-B3-TraceId", root.trace_id)
+            await send(message)
+
+        token = current_span.set(root)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_span.reset(token)
+            route = scope.get("route")
+            if route is not None and hasattr(route, "path"):
+                root.name = f"{scope['method']} {route.path}"
+            self.tracer.end_trace(root)
@@ -1,22 +1,25 @@
 from fastapi import APIRouter, Depends, Request, File, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.services.upload_file import UploadFileService
+from src.services.upload_file import (
+    AvatarStorage,
+    UploadFileService,
+    get_avatar_storage,
+)
 from src.services.users import UserService
 from src.database.db import get_db
-from src.conf.config import settings
 from src.schemas import User
 from src.services.auth import get_current_user
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from src.services.rate_limit import limit_description, rate_limit
 
 router = APIRouter(prefix="/users", tags=["users"])
-limiter = Limiter(key_func=get_remote_address)
 
 
 @router.get(
-    "/me", response_model=User, description="No more than 5 requests per minute"
+    "/me",
+    response_model=User,
+    description=limit_description("users_me"),
 )
-@limiter.limit("5/minute")
+@rate_limit("users_me")
 async def me(request: Request, user: User = Depends(get_current_user)):
     return user
 
@@ -26,12 +29,9 @@ async def update_avatar_user(
     file: UploadFile = File(),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    storage: AvatarStorage = Depends(get_avatar_storage),
 ):
-    avatar_url = UploadFileService(
-        settings.CLOUDINARY_NAME,
-        settings.CLOUDINARY_API_KEY,
-        settings.CLOUDINARY_API_SECRET,
-    ).upload_file(file, user.username)
+    avatar_url = await UploadFileService(storage).upload_file(file, user.username)
 
     user_service = UserService(db)
     user = await user_service.update_avatar_url(user.email, avatar_url)
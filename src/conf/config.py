@@ -12,11 +12,99 @@ class Settings(BaseSettings):
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
     MAIL_FROM: str
+    MAIL_SERVER: str = "smtp.meta.ua"
+    MAIL_PORT: int = 465
+    MAIL_SSL_TLS: bool = True
+    MAIL_POOL_SIZE: int = 2
+    MAIL_POOL_IDLE_TIMEOUT: int = 60
+    # seconds one SMTP operation may take
+    MAIL_TIMEOUT: int = 60
+    # compiled email templates are cached here, system temp directory by default
+    MAIL_TEMPLATE_CACHE_DIR: str | None = None
+
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_CONCURRENCY: int = 5
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_RETRY_BASE_SECONDS: int = 30
+    # must cover a whole batch: OUTBOX_BATCH_SIZE / OUTBOX_CONCURRENCY * MAIL_TIMEOUT
+    OUTBOX_LEASE_SECONDS: int = 900
+    OUTBOX_POLL_INTERVAL: float = 2.0
+    # repeated requests of the same email within this window reuse the queued one
+    EMAIL_COALESCE_SECONDS: int = 300
 
     CLOUDINARY_NAME: str
     CLOUDINARY_API_KEY: int
     CLOUDINARY_API_SECRET: str
 
+    # "cloudinary" or "local", local avatars are served from /static
+    AVATAR_STORAGE: str = "cloudinary"
+    AVATAR_LOCAL_DIR: str = "static/avatars"
+    AVATAR_BASE_URL: str = "/static/avatars"
+    AVATAR_RESIZE_WORKERS: int = 2
+    AVATAR_MAX_SIZE: int = 5 * 1024 * 1024
+    UPLOAD_WORKERS: int = 4
+
+    RATE_LIMIT_STORAGE_URI: str = "redis://redis:6379/1"
+    # "sliding-window-counter", "moving-window" or "fixed-window"
+    RATE_LIMIT_STRATEGY: str = "sliding-window-counter"
+    # per route policies, in the limits notation
+    RATE_LIMITS: dict[str, str] = {
+        "users_me": "5/minute",
+        "password_reset_page": "10/minute",
+    }
+
+    # smaller responses are sent uncompressed, streaming ones are always compressed
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 4
+    # "auto" picks uvloop and httptools, installed with uvicorn[standard]
+    SERVER_LOOP: str = "auto"
+    SERVER_HTTP: str = "auto"
+    SERVER_BACKLOG: int = 2048
+    # longer than the idle timeout of a load balancer in front of the app
+    SERVER_KEEP_ALIVE: int = 75
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    # workers are restarted after this many requests to bound memory, 0 disables
+    SERVER_MAX_REQUESTS: int = 10000
+    SERVER_ACCESS_LOG: bool = True
+
+    # shared by the workers of one server to aggregate /metrics, set by main.run
+    METRICS_DIR: str | None = None
+    METRICS_FLUSH_INTERVAL: float = 5.0
+    # bearer token of the scraper, /metrics is not served while it is unset
+    METRICS_TOKEN: str | None = None
+    METRICS_QUEUE_DEPTH_TTL: int = 15
+
+    # requests over the budget, or repeating one statement this often, are logged
+    SQL_QUERY_BUDGET: int = 20
+    SQL_REPEAT_THRESHOLD: int = 5
+
+    # share of requests traced, 0 disables tracing
+    TRACE_SAMPLE_RATE: float = 0.0
+    # "file" or "stdout", spans are written as Zipkin v2 JSON
+    TRACE_EXPORTER: str = "file"
+    TRACE_FILE: str = "traces.jsonl"
+    TRACE_SERVICE_NAME: str = "contacts-api"
+    # client addresses whose B3 headers are honored, e.g. the gateway
+    TRACE_TRUSTED_HOSTS: list[str] = []
+
+    PROFILE_DIR: str = "profiles"
+    PROFILE_INTERVAL: float = 0.005
+    PROFILE_MAX_SECONDS: int = 300
+    # older profiles are removed from PROFILE_DIR
+    PROFILE_MAX_FILES: int = 200
+
+    # tracemalloc snapshots kept per worker for /admin/memory
+    MEMORY_MAX_SNAPSHOTS: int = 5
+
+    # admin dashboard figures are cached for this many seconds
+    DASHBOARD_CACHE_TTL: int = 30
+    DASHBOARD_DAYS: int = 30
+
     model_config = ConfigDict(
         extra="ignore", env_file=".env", env_file_encoding="utf-8", case_sensitive=True
     )
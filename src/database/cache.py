@@ -1,4 +1,3 @@
-from redis import Redis
 from abc import ABC, abstractmethod
 
 
@@ -8,21 +7,37 @@ class Cache(ABC):
         pass
 
     @abstractmethod
-    def put(self, key, value):
+    def put(self, key, value, ttl: int = 3600):
+        pass
+
+    @abstractmethod
+    def add(self, key, value, ttl: int) -> bool:
+        """Store `value` for `ttl` seconds only if `key` is absent, return True if stored."""
+        pass
+
+    @abstractmethod
+    def delete(self, key):
         pass
 
 
 class RedisCache(Cache):
 
     def __init__(self):
+        from redis import Redis
+
         self.redis = Redis(host="redis", port=6379, db=0)
 
     def get(self, key):
         return self.redis.get(str(key))
 
-    def put(self, key, value):
-        self.redis.set(str(key), value)
-        self.redis.expire(str(key), 3600)
+    def put(self, key, value, ttl: int = 3600):
+        self.redis.set(str(key), value, ex=ttl)
+
+    def add(self, key, value, ttl: int) -> bool:
+        return bool(self.redis.set(str(key), value, ex=ttl, nx=True))
+
+    def delete(self, key):
+        self.redis.delete(str(key))
 
 
 cache: Cache = None
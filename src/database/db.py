@@ -8,19 +8,48 @@ from sqlalchemy.ext.asyncio import (
 )
 
 from src.conf.config import settings
+from src.services.metrics import instrument_engine
+from src.services.request_timing import track_engine
 
 
 class DatabaseSessionManager:
-    def __init__(self, url: str):
-        self._engine: AsyncEngine | None = create_async_engine(url)
-        self._session_maker: async_sessionmaker = async_sessionmaker(
-            autoflush=False, autocommit=False, bind=self._engine
+    """
+    Owns the engine and the session factory.
+
+    The engine is created by `init`, called on application startup, so
+    importing the app doesn't build a connection pool. Processes without
+    a startup hook get it created by the first session.
+    """
+
+    def __init__(self, url: str | None = None):
+        self._url = url
+        self._engine: AsyncEngine | None = None
+        self._session_maker: async_sessionmaker | None = None
+
+    def init(self, url: str | None = None):
+        if self._engine is not None:
+            return
+        self._engine = create_async_engine(url or self._url or settings.DB_URL)
+        instrument_engine(self._engine)
+        track_engine(self._engine)
+        self._session_maker = async_sessionmaker(
+            autoflush=False,
+            autocommit=False,
+            expire_on_commit=False,
+            bind=self._engine,
         )
 
+    async def close(self):
+        if self._engine is None:
+            return
+        await self._engine.dispose()
+        self._engine = None
+        self._session_maker = None
+
     @contextlib.asynccontextmanager
     async def session(self):
         if self._session_maker is None:
-            raise Exception("Database session is not initialized")
+            self.init()
         session = self._session_maker()
         try:
             yield session
@@ -31,7 +60,7 @@ class DatabaseSessionManager:
             await session.close()
 
 
-sessionmanager = DatabaseSessionManager(settings.DB_URL)
+sessionmanager = DatabaseSessionManager()
 
 
 async def get_db():
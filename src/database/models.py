@@ -29,6 +29,34 @@ class Contact(Base):
     user = relationship("User", backref="notes")
 
 
+class ContactCounter(Base):
+    __tablename__ = "contact_counters"
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class StatCounter(Base):
+    """Running totals for the admin dashboard, maintained by repository writes."""
+
+    __tablename__ = "stat_counters"
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    # counters are split into shards like daily_stats, readers sum them
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True)
+    value: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class DailyStat(Base):
+    """Per-day figures, split into shards so concurrent writes don't share a row."""
+
+    __tablename__ = "daily_stats"
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True)
+    signups: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    contacts_created: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
 class UserRole(Enum):
     USER = "user"
     ADMIN = "admin"
@@ -45,6 +73,61 @@ class User(Base):
     confirmed = Column(Boolean, default=False)
     role = Column(PgEnum(UserRole, name="role"), nullable=False, default=UserRole.USER)
 
+    __table_args__ = (
+        sa.Index("ix_users_username_lower", func.lower(username), unique=True),
+        sa.Index("ix_users_email_lower", func.lower(email), unique=True),
+        # prefix search of /admin/users, LIKE 'abc%' needs the pattern opclass
+        sa.Index(
+            "ix_users_username_prefix",
+            func.lower(username).label("username_lower"),
+            postgresql_ops={"username_lower": "text_pattern_ops"},
+        ),
+        sa.Index(
+            "ix_users_email_prefix",
+            func.lower(email).label("email_lower"),
+            postgresql_ops={"email_lower": "text_pattern_ops"},
+        ),
+        sa.Index("ix_users_role_confirmed_id", role, confirmed, id),
+        sa.Index("ix_users_created_at_id", created_at, id),
+    )
+
     # to simplify caching
     def as_dict(self):
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+
+
+class EmailKind(Enum):
+    CONFIRM_EMAIL = "confirm_email"
+    RESET_PASSWORD = "reset_password"
+
+
+class EmailStatus(Enum):
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[EmailKind] = mapped_column(
+        sa.Enum(EmailKind, native_enum=False, length=20), nullable=False
+    )
+    recipient: Mapped[str] = mapped_column(String(255), nullable=False)
+    username: Mapped[str] = mapped_column(String(255), nullable=False)
+    host: Mapped[str] = mapped_column(String(255), nullable=False)
+    status: Mapped[EmailStatus] = mapped_column(
+        sa.Enum(EmailStatus, native_enum=False, length=20),
+        nullable=False,
+        default=EmailStatus.PENDING,
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    sent_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[str] = mapped_column(String(500), nullable=True)
+
+    __table_args__ = (
+        sa.Index("ix_email_outbox_status_next_attempt_at", status, next_attempt_at),
+    )
@@ -0,0 +1,14 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def insert_for(session: AsyncSession, table):
+    """
+    Build an INSERT for the session's dialect which supports `on_conflict_do_update`.
+
+    Postgres is used in production and SQLite in tests, both share the same
+    ON CONFLICT API in SQLAlchemy.
+    """
+    if session.bind.dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
@@ -1,11 +1,30 @@
-from sqlalchemy import select, func, extract
+from sqlalchemy import select, insert, update, delete, func, extract, literal
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.database.models import Contact, User
-from src.schemas import ContactModel
-from typing import List
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import Delete, Insert
+from src.database.models import Contact, ContactCounter, User
+from src.database.upsert import insert_for
+from src.repository.stats import StatsRepository
+from src.schemas import ContactModel, ContactFilter, ContactUpdate
+from src.services.tracing import traced_methods
+from typing import AsyncIterator, List
 from datetime import date, timedelta
 
+# columns exposed by the read-only row queries, in response order
+CONTACT_FIELDS = (
+    "id",
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "date_of_birth",
+    "info",
+    "created_at",
+)
 
+
+@traced_methods
 class ContactRepository:
     def __init__(self, session: AsyncSession):
         """
@@ -15,22 +34,24 @@ class ContactRepository:
             session: An AsyncSession object connected to the database.
         """
         self.db = session
+        self.stats = StatsRepository(session)
 
-    async def get_contacts(self, skip: int, limit: int, user: User) -> List[Contact]:
+    async def count_contacts(self, user: User) -> int:
         """
-        Get a list of Contacts owned by `user` with pagination.
+        Get the total number of Contacts owned by `user`.
+
+        The value is read from a counter maintained by the write methods
+        of this repository, so no rows of `contacts` are scanned.
 
         Args:
-            skip: The number of Contacts to skip.
-            limit: The maximum number of Contacts to return.
-            user: The owner of the Contacts to retrieve.
+            user: The owner of the Contacts to count.
 
         Returns:
-            A list of Contacts.
+            The number of Contacts.
         """
-        stmt = select(Contact).filter_by(user=user).offset(skip).limit(limit)
-        contacts = await self.db.execute(stmt)
-        return contacts.scalars().all()
+        stmt = select(ContactCounter.total).filter_by(user_id=user.id)
+        total = await self.db.execute(stmt)
+        return total.scalar_one_or_none() or 0
 
     async def get_contact_by_id(self, contact_id: int, user: User) -> Contact | None:
         """
@@ -47,6 +68,50 @@ class ContactRepository:
         contact = await self.db.execute(stmt)
         return contact.scalar_one_or_none()
 
+    async def get_contacts_by_ids(self, ids: List[int], user: User) -> List[Contact]:
+        """
+        Get Contacts by a list of ids in one query.
+
+        Args:
+            ids: The ids of the Contacts to retrieve.
+            user: The owner of the Contacts to retrieve.
+
+        Returns:
+            A list of found Contacts in no particular order.
+        """
+        stmt = select(Contact).filter_by(user=user).where(Contact.id.in_(ids))
+        contacts = await self.db.execute(stmt)
+        return contacts.scalars().all()
+
+    async def stream_contacts(
+        self, user: User, after_id: int = 0, batch_size: int = 500
+    ) -> AsyncIterator[Contact]:
+        """
+        Stream all Contacts owned by `user` ordered by id, using a server-side cursor.
+
+        Rows are fetched from the database in batches of `batch_size`, so memory
+        usage does not depend on the total number of Contacts.
+
+        Args:
+            user: The owner of the Contacts to retrieve.
+            after_id: Only Contacts with id greater than this are returned,
+                which allows resuming an interrupted export.
+            batch_size: The number of rows fetched from the cursor at once.
+
+        Yields:
+            Contacts one by one.
+        """
+        stmt = (
+            select(Contact)
+            .filter_by(user=user)
+            .where(Contact.id > after_id)
+            .order_by(Contact.id)
+            .execution_options(yield_per=batch_size)
+        )
+        contacts = await self.db.stream_scalars(stmt)
+        async for contact in contacts:
+            yield contact
+
     async def create_contact(self, body: ContactModel, user: User) -> Contact:
         """
         Create a new Contact with the given attributes.
@@ -58,11 +123,12 @@ class ContactRepository:
         Returns:
             A Contact with the assigned attributes.
         """
-        contact = Contact(**body.model_dump(exclude_unset=True), user=user)
-        self.db.add(contact)
+        stmt = insert(Contact).values(
+            **body.model_dump(exclude_unset=True), user_id=user.id
+        )
+        [contact] = await self._write_counted(stmt, user, 1, contacts_created=1)
         await self.db.commit()
-        await self.db.refresh(contact)
-        return await self.get_contact_by_id(contact.id, user)
+        return contact
 
     async def delete_contact(self, contact_id: int, user: User) -> Contact | None:
         """
@@ -75,11 +141,14 @@ class ContactRepository:
         Returns:
             The deleted Contact, or None if no Contact with the given id exists.
         """
-        contact = await self.get_contact_by_id(contact_id, user)
-        if contact:
-            await self.db.delete(contact)
-            await self.db.commit()
-        return contact
+        stmt = delete(Contact).where(
+            Contact.id == contact_id, Contact.user_id == user.id
+        )
+        deleted = await self._write_counted(stmt, user, -1)
+        if not deleted:
+            return None
+        await self.db.commit()
+        return deleted[0]
 
     async def update_contact(
         self, contact_id: int, body: ContactModel, user: User
@@ -95,16 +164,212 @@ class ContactRepository:
         Returns:
             The updated Contact, or None if no Contacts with the given id exists.
         """
-        contact = await self.get_contact_by_id(contact_id, user)
+        stmt = (
+            update(Contact)
+            .where(Contact.id == contact_id, Contact.user_id == user.id)
+            .values(**body.model_dump(exclude_unset=True))
+            .returning(Contact)
+        )
+        result = await self.db.execute(stmt)
+        contact = result.scalar_one_or_none()
         if contact:
-            for key, value in body.model_dump(exclude_unset=True).items():
-                setattr(contact, key, value)
-
             await self.db.commit()
-            await self.db.refresh(contact)
         return contact
 
-    async def search_contacts(
+    async def update_contacts(
+        self,
+        ids: List[int] | None,
+        filter: ContactFilter | None,
+        body: ContactUpdate,
+        user: User,
+    ) -> List[int]:
+        """
+        Update all Contacts matching `ids` and `filter` in one statement.
+
+        Args:
+            ids: Optional list of Contact ids to update.
+            filter: Optional filter by first name, last name or email.
+            body: A ContactUpdate with the attributes to assign to the Contacts.
+            user: The User who owns the Contacts.
+
+        Returns:
+            A list of ids of the updated Contacts.
+        """
+        stmt = (
+            update(Contact)
+            .where(*self._batch_conditions(ids, filter, user))
+            .values(**body.model_dump(exclude_unset=True, exclude_none=True))
+            .returning(Contact.id)
+        )
+        result = await self.db.execute(stmt)
+        updated_ids = list(result.scalars().all())
+        await self.db.commit()
+        return updated_ids
+
+    async def delete_contacts(
+        self, ids: List[int] | None, filter: ContactFilter | None, user: User
+    ) -> List[int]:
+        """
+        Delete all Contacts matching `ids` and `filter` in one statement.
+
+        Args:
+            ids: Optional list of Contact ids to delete.
+            filter: Optional filter by first name, last name or email.
+            user: The User who owns the Contacts.
+
+        Returns:
+            A list of ids of the deleted Contacts.
+        """
+        stmt = delete(Contact).where(*self._batch_conditions(ids, filter, user))
+        deleted_ids = await self._write_counted(stmt, user, -1, ids_only=True)
+        await self.db.commit()
+        return deleted_ids
+
+    async def _write_counted(
+        self,
+        stmt: Insert | Delete,
+        user: User,
+        sign: int,
+        contacts_created: int = 0,
+        ids_only: bool = False,
+    ) -> list:
+        """
+        Execute an INSERT or DELETE of `user`'s Contacts together with the
+        upserts of the Contact counter and the dashboard figures.
+
+        On Postgres the upserts are data-modifying CTEs of the same statement,
+        so a write is one round trip. SQLite can't modify data in a CTE and
+        runs them one by one.
+
+        Args:
+            stmt: The INSERT or DELETE, without RETURNING.
+            user: The owner of the Contacts.
+            sign: 1 if `stmt` adds Contacts, -1 if it removes them.
+            contacts_created: The number of Contacts to count as created today.
+            ids_only: Return the ids instead of the Contacts.
+
+        Returns:
+            A list of written Contacts or their ids.
+        """
+        if self.db.bind.dialect.name == "postgresql":
+            stmt = self._counted_statement(stmt, user, sign, contacts_created, ids_only)
+            result = await self.db.execute(stmt)
+            return list(result.scalars().all())
+
+        result = await self.db.execute(
+            stmt.returning(Contact.id if ids_only else Contact)
+        )
+        written = list(result.scalars().all())
+        if written:
+            await self._change_counter(user, sign * len(written))
+            if contacts_created:
+                await self.stats.add_daily(user.id, contacts_created=contacts_created)
+        return written
+
+    def _counted_statement(
+        self,
+        stmt: Insert | Delete,
+        user: User,
+        sign: int,
+        contacts_created: int,
+        ids_only: bool,
+    ):
+        written = stmt.returning(*Contact.__table__.c).cte("written")
+        delta = (
+            select((sign * func.count()).label("delta"))
+            .select_from(written)
+            .cte("delta")
+        )
+        counter = postgresql.insert(ContactCounter).from_select(
+            ["user_id", "total"],
+            select(literal(user.id), delta.c.delta).where(delta.c.delta != 0),
+        )
+        counter = (
+            counter.on_conflict_do_update(
+                index_elements=[ContactCounter.user_id],
+                set_={"total": ContactCounter.total + counter.excluded.total},
+            )
+            .returning(ContactCounter.total)
+            .cte("counter")
+        )
+        totals = select(
+            (counter.c.total - delta.c.delta).label("old_total"),
+            counter.c.total.label("new_total"),
+        ).subquery("totals")
+        ctes = [
+            counter,
+            self.stats.move_contacts_bucket_stmt(user.id, totals).cte(
+                "bucket_counters"
+            ),
+        ]
+        if contacts_created:
+            daily = self.stats.add_daily_stmt(
+                user.id, contacts_created=contacts_created
+            )
+            ctes.append(daily.cte("daily"))
+        columns = written.c.id if ids_only else aliased(Contact, written)
+        return select(columns).add_cte(*ctes)
+
+    async def _change_counter(self, user: User, delta: int) -> None:
+        stmt = insert_for(self.db, ContactCounter).values(user_id=user.id, total=delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ContactCounter.user_id],
+            set_={"total": ContactCounter.total + stmt.excluded.total},
+        ).returning(ContactCounter.total)
+        result = await self.db.execute(stmt)
+        total = result.scalar_one()
+        await self.stats.move_contacts_bucket(user.id, total - delta, total)
+
+    @staticmethod
+    def _batch_conditions(
+        ids: List[int] | None, filter: ContactFilter | None, user: User
+    ) -> list:
+        conditions = [Contact.user_id == user.id]
+        if ids is not None:
+            conditions.append(Contact.id.in_(ids))
+        if filter is not None:
+            for key, value in filter.model_dump(exclude_none=True).items():
+                conditions.append(getattr(Contact, key) == value)
+        return conditions
+
+    @staticmethod
+    def _closest_birthday_conditions() -> list:
+        today = date.today()
+        week_from_now = today + timedelta(days=7)
+
+        range_start_day = today.day
+        range_start_month = today.month
+
+        range_end_day = week_from_now.day
+        range_end_month = week_from_now.month
+
+        return [
+            extract("day", Contact.date_of_birth) >= range_start_day,
+            extract("month", Contact.date_of_birth) >= range_start_month,
+            extract("day", Contact.date_of_birth) <= range_end_day,
+            extract("month", Contact.date_of_birth) <= range_end_month,
+        ]
+
+    async def get_contact_rows(
+        self, skip: int, limit: int, user: User, fields: List[str] | None = None
+    ) -> List[dict]:
+        """
+        Get the Contacts owned by `user` with pagination, selecting only `fields`.
+
+        Args:
+            skip: The number of Contacts to skip.
+            limit: The maximum number of Contacts to return.
+            user: The owner of the Contacts to retrieve.
+            fields: Names of the columns to select, all of CONTACT_FIELDS by default.
+
+        Returns:
+            A list of dicts with the selected columns.
+        """
+        return await self._select_rows(
+            self._batch_conditions(None, None, user), fields, skip, limit
+        )
+
+    async def search_contact_rows(
         self,
         first_name: str | None,
         last_name: str | None,
@@ -112,9 +377,11 @@ class ContactRepository:
         skip: int,
         limit: int,
         user: User,
-    ) -> List[Contact]:
+        fields: List[str] | None = None,
+    ) -> List[dict]:
         """
-        Get a list of Contacts owned by `user` with pagination, considering filter params
+        Get the Contacts owned by `user` with pagination, considering filter
+        params and selecting only `fields`.
 
         Args:
             first_name: Optional filter by first name
@@ -123,47 +390,47 @@ class ContactRepository:
             skip: The number of Contacts to skip.
             limit: The maximum number of Contacts to return.
             user: The owner of the Contacts to retrieve.
+            fields: Names of the columns to select, all of CONTACT_FIELDS by default.
 
         Returns:
-            A list of Contacts, filtered by params
-        """
-        stmt = select(Contact).filter_by(user=user).offset(skip).limit(limit)
-        if first_name:
-            stmt = stmt.filter_by(first_name=first_name)
-        if last_name:
-            stmt = stmt.filter_by(last_name=last_name)
-        if email:
-            stmt = stmt.filter_by(email=email)
-        contacts = await self.db.execute(stmt)
-        return contacts.scalars().all()
+            A list of dicts with the selected columns, filtered by params
+        """
+        filter = ContactFilter(
+            first_name=first_name or None,
+            last_name=last_name or None,
+            email=email or None,
+        )
+        return await self._select_rows(
+            self._batch_conditions(None, filter, user), fields, skip, limit
+        )
 
-    async def get_closest_brithday_contacts(self, user: User) -> List[Contact]:
+    async def get_closest_birthday_rows(
+        self, user: User, fields: List[str] | None = None
+    ) -> List[dict]:
         """
-        Get a list of Contacts with birthday within next 7 days.
+        Get the Contacts with birthday within next 7 days, selecting only `fields`.
 
         Args:
             user: The owner of the Contacts to retrieve.
+            fields: Names of the columns to select, all of CONTACT_FIELDS by default.
 
         Returns:
-            A list of Contacts.
+            A list of dicts with the selected columns.
         """
-        today = date.today()
-        week_from_now = today + timedelta(days=7)
-
-        range_start_day = today.day
-        range_start_month = today.month
+        conditions = self._batch_conditions(None, None, user)
+        conditions.extend(self._closest_birthday_conditions())
+        return await self._select_rows(conditions, fields)
 
-        range_end_day = week_from_now.day
-        range_end_month = week_from_now.month
-
-        stmt = (
-            select(Contact)
-            .filter_by(user=user)
-            .where(extract("day", Contact.date_of_birth) >= range_start_day)
-            .where(extract("month", Contact.date_of_birth) >= range_start_month)
-            .where(extract("day", Contact.date_of_birth) <= range_end_day)
-            .where(extract("month", Contact.date_of_birth) <= range_end_month)
-        )
-
-        contacts = await self.db.execute(stmt)
-        return contacts.scalars().all()
+    async def _select_rows(
+        self,
+        conditions: list,
+        fields: List[str] | None,
+        skip: int = 0,
+        limit: int | None = None,
+    ) -> List[dict]:
+        # plain Core select of table columns: no ORM instances, no identity map
+        table = Contact.__table__
+        columns = [table.c[name] for name in fields or CONTACT_FIELDS]
+        stmt = select(*columns).where(*conditions).offset(skip).limit(limit)
+        rows = await self.db.execute(stmt)
+        return [row._asdict() for row in rows]
@@ -0,0 +1,218 @@
+from datetime import datetime, timedelta, UTC
+from typing import List
+
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import EmailOutbox, EmailKind, EmailStatus
+from src.services.tracing import traced_methods
+
+# statuses of emails which are not delivered yet
+QUEUED_STATUSES = [EmailStatus.PENDING, EmailStatus.SENDING]
+
+
+def utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+@traced_methods
+class EmailOutboxRepository:
+    def __init__(self, session: AsyncSession):
+        """
+        Initialize an EmailOutboxRepository.
+
+        Args:
+            session: An AsyncSession object connected to the database.
+        """
+        self.db = session
+
+    def add(self, kind: EmailKind, recipient: str, username: str, host: str) -> None:
+        """
+        Add an email to the outbox without committing.
+
+        The email is stored by the commit of the change that triggered it,
+        so either both are persisted or none.
+
+        Args:
+            kind: The kind of the email, defines template and token.
+            recipient: The email address to send the email to.
+            username: The name of the recipient.
+            host: The base url of the service, used for links in the email.
+        """
+        now = utcnow()
+        self.db.add(
+            EmailOutbox(
+                kind=kind,
+                recipient=recipient,
+                username=username,
+                host=host,
+                status=EmailStatus.PENDING,
+                attempts=0,
+                next_attempt_at=now,
+                created_at=now,
+            )
+        )
+
+    async def enqueue(
+        self, kind: EmailKind, recipient: str, username: str, host: str
+    ) -> None:
+        """
+        Add an email to the outbox and commit.
+
+        Args:
+            kind: The kind of the email, defines template and token.
+            recipient: The email address to send the email to.
+            username: The name of the recipient.
+            host: The base url of the service, used for links in the email.
+        """
+        self.add(kind, recipient, username, host)
+        await self.db.commit()
+
+    async def claim_batch(self, limit: int, lease_seconds: int) -> List[EmailOutbox]:
+        """
+        Claim a batch of emails due for delivery.
+
+        Rows are selected with FOR UPDATE SKIP LOCKED, so concurrent workers
+        never claim the same email. Claimed emails are leased for
+        `lease_seconds`: if the worker dies before reporting the result,
+        the email becomes due again once the lease expires.
+
+        Args:
+            limit: The maximum number of emails to claim.
+            lease_seconds: How long the claimed emails are reserved for this worker.
+
+        Returns:
+            A list of claimed emails, `next_attempt_at` of each is the lease end.
+        """
+        now = utcnow()
+        due = (
+            select(EmailOutbox.id)
+            .where(
+                EmailOutbox.status.in_(QUEUED_STATUSES),
+                EmailOutbox.next_attempt_at <= now,
+            )
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due))
+            .values(
+                status=EmailStatus.SENDING,
+                attempts=EmailOutbox.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=lease_seconds),
+            )
+            .returning(EmailOutbox)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(stmt)
+        emails = result.scalars().all()
+        await self.db.commit()
+        return emails
+
+    async def record_results(
+        self,
+        lease_until: datetime,
+        sent_ids: List[int],
+        failures: List[tuple[int, str, datetime | None]],
+    ) -> int:
+        """
+        Store delivery results of a claimed batch.
+
+        Only emails still leased by the batch are updated: an email whose
+        lease expired may have been claimed again by another worker, and its
+        result belongs to that worker.
+
+        Args:
+            lease_until: The lease end of the batch, as returned by `claim_batch`
+                in `next_attempt_at`.
+            sent_ids: The ids of delivered emails.
+            failures: Tuples of email id, error message and the time of the
+                next attempt, or None if the email should not be retried.
+
+        Returns:
+            The number of results which were not stored because the lease was lost.
+        """
+        leased = [
+            EmailOutbox.status == EmailStatus.SENDING,
+            EmailOutbox.next_attempt_at == lease_until,
+        ]
+        stored = 0
+        if sent_ids:
+            result = await self.db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id.in_(sent_ids), *leased)
+                .values(status=EmailStatus.SENT, sent_at=utcnow(), last_error=None)
+                .execution_options(synchronize_session=False)
+            )
+            stored += result.rowcount
+        for email_id, error, retry_at in failures:
+            result = await self.db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id == email_id, *leased)
+                .values(
+                    status=EmailStatus.PENDING if retry_at else EmailStatus.FAILED,
+                    next_attempt_at=retry_at or utcnow(),
+                    last_error=error[:500],
+                )
+                .execution_options(synchronize_session=False)
+            )
+            stored += result.rowcount
+        await self.db.commit()
+        return len(sent_ids) + len(failures) - stored
+
+    async def get_queue_depth(self) -> tuple[int, int, float]:
+        """
+        Get the number of queued and failed emails.
+
+        Returns:
+            The number of queued emails, the number of failed emails and
+            the age of the oldest queued email in seconds.
+        """
+        is_queued = EmailOutbox.status.in_(QUEUED_STATUSES)
+        stmt = select(
+            func.count().filter(is_queued),
+            func.count().filter(EmailOutbox.status == EmailStatus.FAILED),
+            func.min(EmailOutbox.created_at).filter(is_queued),
+        ).where(EmailOutbox.status.in_([*QUEUED_STATUSES, EmailStatus.FAILED]))
+        queued, failed, oldest = (await self.db.execute(stmt)).one()
+
+        oldest_age = (utcnow() - oldest).total_seconds() if oldest is not None else 0.0
+        return queued, failed, oldest_age
+
+    async def get_stats(self, latency_sample: int = 500) -> dict:
+        """
+        Get queue depth and delivery latency of the outbox.
+
+        Args:
+            latency_sample: The number of most recently sent emails used
+                to compute delivery latency.
+
+        Returns:
+            A dict with the number of queued and failed emails, the age of the
+            oldest queued email and the average and 95th percentile delivery
+            latency, all in seconds.
+        """
+        queued, failed, oldest_queued_age = await self.get_queue_depth()
+
+        stmt = (
+            select(EmailOutbox.created_at, EmailOutbox.sent_at)
+            .where(EmailOutbox.status == EmailStatus.SENT)
+            .order_by(EmailOutbox.sent_at.desc())
+            .limit(latency_sample)
+        )
+        latencies = sorted(
+            (sent_at - created_at).total_seconds()
+            for created_at, sent_at in (await self.db.execute(stmt)).all()
+        )
+
+        return {
+            "queued": queued,
+            "failed": failed,
+            "oldest_queued_age": oldest_queued_age,
+            "latency_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_p95": (
+                latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+            ),
+        }
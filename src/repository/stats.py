@@ -0,0 +1,215 @@
+from datetime import UTC, date, datetime
+from typing import Dict, List
+
+from sqlalchemy import Row, case, func, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Insert
+
+from src.database.models import DailyStat, StatCounter
+from src.database.upsert import insert_for
+from src.services.tracing import traced_methods
+
+USERS_COUNTER = "users"
+CONFIRMED_USERS_COUNTER = "confirmed_users"
+
+# lower bounds of the contacts per user buckets, the last one is open-ended
+CONTACTS_PER_USER_BUCKETS = (0, 1, 10, 50, 100, 500, 1000)
+
+# rows per counter and per day, writes of different users go to different rows
+STATS_SHARDS = 16
+
+
+def today() -> date:
+    """Current day of the dashboard, in UTC for all writers and readers."""
+    return datetime.now(UTC).date()
+
+
+def stats_shard(user_id: int) -> int:
+    return user_id % STATS_SHARDS
+
+
+def contacts_bucket(total: int) -> str:
+    """Name of the counter of users owning `total` Contacts."""
+    lower = max(bound for bound in CONTACTS_PER_USER_BUCKETS if bound <= total)
+    return f"contacts_per_user:{lower}"
+
+
+def contacts_bucket_expr(total):
+    """SQL expression of `contacts_bucket` for a column holding the total."""
+    return case(
+        *(
+            (total >= lower, literal(f"contacts_per_user:{lower}"))
+            for lower in reversed(CONTACTS_PER_USER_BUCKETS)
+        )
+    )
+
+
+def bucket_label(lower: int) -> str:
+    index = CONTACTS_PER_USER_BUCKETS.index(lower)
+    if index == len(CONTACTS_PER_USER_BUCKETS) - 1:
+        return f"{lower}+"
+    upper = CONTACTS_PER_USER_BUCKETS[index + 1] - 1
+    return str(lower) if upper == lower else f"{lower}-{upper}"
+
+
+@traced_methods
+class StatsRepository:
+    """
+    Summary tables of the admin dashboard.
+
+    Write methods only add statements to the caller's transaction, so
+    the figures are committed together with the change they describe.
+    Both tables are split into STATS_SHARDS rows per counter or day, a
+    write goes to the shard of the user it counts and readers sum them.
+
+    The `*_stmt` methods build the upserts without executing them, for
+    callers which fold them into their own statement.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.db = session
+
+    async def change_counters(self, user_id: int, deltas: Dict[str, int]) -> None:
+        """
+        Add `deltas` to the named counters in one statement.
+
+        Rows are written in name order, so concurrent transactions lock
+        them in the same order and can't deadlock each other.
+
+        Args:
+            user_id: The user whose change is counted, selects the shard.
+            deltas: Counter names mapped to the values to add.
+        """
+        shard = stats_shard(user_id)
+        stmt = insert_for(self.db, StatCounter).values(
+            [
+                {"name": name, "shard": shard, "value": delta}
+                for name, delta in sorted(deltas.items())
+            ]
+        )
+        await self.db.execute(self._add_to_counters(stmt))
+
+    async def move_contacts_bucket(
+        self, user_id: int, old_total: int, new_total: int
+    ) -> None:
+        """
+        Move a user to another contacts per user bucket if `new_total` needs it.
+
+        Args:
+            user_id: The user whose Contacts changed.
+            old_total: The number of Contacts of the user before the change.
+            new_total: The number of Contacts of the user after the change.
+        """
+        old_bucket = contacts_bucket(old_total)
+        new_bucket = contacts_bucket(new_total)
+        if old_bucket != new_bucket:
+            await self.change_counters(user_id, {old_bucket: -1, new_bucket: 1})
+
+    def move_contacts_bucket_stmt(self, user_id: int, totals) -> Insert:
+        """
+        Build the upsert of `move_contacts_bucket` for totals known only
+        to the database, e.g. returned by a CTE of the same statement.
+
+        Args:
+            user_id: The user whose Contacts changed.
+            totals: A selectable with `old_total` and `new_total` columns,
+                empty if the user's total did not change.
+        """
+        buckets = select(
+            contacts_bucket_expr(totals.c.old_total).label("old_bucket"),
+            contacts_bucket_expr(totals.c.new_total).label("new_bucket"),
+        ).cte("bucket_names")
+        moved = buckets.c.old_bucket != buckets.c.new_bucket
+        moves = union_all(
+            select(
+                buckets.c.old_bucket.label("name"), literal(-1).label("value")
+            ).where(moved),
+            select(buckets.c.new_bucket.label("name"), literal(1).label("value")).where(
+                moved
+            ),
+        ).subquery("moves")
+        rows = select(
+            moves.c.name, literal(stats_shard(user_id)), moves.c.value
+        ).order_by(moves.c.name)
+        stmt = insert_for(self.db, StatCounter).from_select(
+            ["name", "shard", "value"], rows
+        )
+        return self._add_to_counters(stmt)
+
+    async def add_daily(
+        self, user_id: int, signups: int = 0, contacts_created: int = 0
+    ) -> None:
+        """
+        Add to the figures of the current day, in the shard of `user_id`.
+
+        Args:
+            user_id: The user whose action is counted.
+            signups: The number of new users.
+            contacts_created: The number of new Contacts.
+        """
+        await self.db.execute(self.add_daily_stmt(user_id, signups, contacts_created))
+
+    def add_daily_stmt(
+        self, user_id: int, signups: int = 0, contacts_created: int = 0
+    ) -> Insert:
+        """Build the upsert of `add_daily`."""
+        stmt = insert_for(self.db, DailyStat).values(
+            day=today(),
+            shard=stats_shard(user_id),
+            signups=signups,
+            contacts_created=contacts_created,
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=[DailyStat.day, DailyStat.shard],
+            set_={
+                "signups": DailyStat.signups + stmt.excluded.signups,
+                "contacts_created": DailyStat.contacts_created
+                + stmt.excluded.contacts_created,
+            },
+        )
+
+    async def get_counters(self) -> Dict[str, int]:
+        """
+        Get all counters with shards summed up, the table holds a few
+        hundred rows at most.
+
+        Returns:
+            Counter names mapped to their values.
+        """
+        result = await self.db.execute(
+            select(StatCounter.name, func.sum(StatCounter.value)).group_by(
+                StatCounter.name
+            )
+        )
+        return {name: value for name, value in result}
+
+    async def get_daily(self, since: date) -> List[Row]:
+        """
+        Get the figures of every day starting from `since`, with shards summed up.
+
+        Args:
+            since: The first day to return.
+
+        Returns:
+            A list of rows with day, signups and contacts_created ordered by day,
+            days without activity are absent.
+        """
+        stmt = (
+            select(
+                DailyStat.day,
+                func.sum(DailyStat.signups).label("signups"),
+                func.sum(DailyStat.contacts_created).label("contacts_created"),
+            )
+            .where(DailyStat.day >= since)
+            .group_by(DailyStat.day)
+            .order_by(DailyStat.day)
+        )
+        result = await self.db.execute(stmt)
+        return result.all()
+
+    @staticmethod
+    def _add_to_counters(stmt: Insert) -> Insert:
+        return stmt.on_conflict_do_update(
+            index_elements=[StatCounter.name, StatCounter.shard],
+            set_={"value": StatCounter.value + stmt.excluded.value},
+        )
@@ -1,13 +1,35 @@
-from sqlalchemy import select
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import select, insert, update, func, literal, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.models import User
+from src.database.models import User, EmailKind, UserRole
+from src.repository.email_outbox import EmailOutboxRepository
+from src.repository.stats import (
+    CONFIRMED_USERS_COUNTER,
+    USERS_COUNTER,
+    StatsRepository,
+    contacts_bucket,
+)
 from src.schemas import UserCreate
+from src.services.tracing import traced_methods
+
+# columns returned by the admin user list, the password hash is never selected
+USER_LIST_FIELDS = ("id", "username", "email", "role", "confirmed", "created_at")
+
 
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
+
+@traced_methods
 class UserRepository:
     def __init__(self, session: AsyncSession):
         self.db = session
+        self.outbox = EmailOutboxRepository(session)
+        self.stats = StatsRepository(session)
 
     async def get_user_by_id(self, user_id: int) -> User | None:
         stmt = select(User).filter_by(id=user_id)
@@ -15,41 +37,154 @@ class UserRepository:
         return user.scalar_one_or_none()
 
     async def get_user_by_username(self, username: str) -> User | None:
-        stmt = select(User).filter_by(username=username)
+        stmt = select(User).where(func.lower(User.username) == username.lower())
         user = await self.db.execute(stmt)
         return user.scalar_one_or_none()
 
     async def get_user_by_email(self, email: str) -> User | None:
-        stmt = select(User).filter_by(email=email)
+        stmt = select(User).where(func.lower(User.email) == email.lower())
         user = await self.db.execute(stmt)
         return user.scalar_one_or_none()
 
-    async def create_user(self, body: UserCreate, avatar: str = None) -> User:
-        user = User(
-            **body.model_dump(exclude_unset=True, exclude={"password"}),
-            hashed_password=body.password,
-            avatar=avatar,
+    async def user_exists(self, username: str, email: str) -> bool:
+        """
+        Check if a user has `username` or `email`, ignoring letter case.
+
+        Args:
+            username: The username to look for.
+            email: The email to look for.
+
+        Returns:
+            True if either of them is taken.
+        """
+        stmt = select(
+            select(User.id)
+            .where(
+                or_(
+                    func.lower(User.username) == username.lower(),
+                    func.lower(User.email) == email.lower(),
+                )
+            )
+            .exists()
         )
-        self.db.add(user)
+        return (await self.db.execute(stmt)).scalar_one()
+
+    async def list_user_rows(
+        self,
+        limit: int,
+        before_id: int | None = None,
+        role: UserRole | None = None,
+        confirmed: bool | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        search: str | None = None,
+    ) -> List[dict]:
+        """
+        Get a page of users, newest first, with keyset pagination.
+
+        Every filter is optional. Pages are continued with the id of the last
+        user of the previous page, so the cost of a page does not depend on
+        how deep it is.
+
+        Args:
+            limit: The maximum number of users to return.
+            before_id: Only users with id lower than this are returned.
+            role: Only users with this role.
+            confirmed: Only users with this confirmation status.
+            created_from: Only users created at or after this time.
+            created_to: Only users created before this time.
+            search: Case-insensitive prefix of the username or email.
+
+        Returns:
+            A list of dicts with the USER_LIST_FIELDS columns.
+        """
+        table = User.__table__
+        stmt = select(*[table.c[name] for name in USER_LIST_FIELDS])
+        if before_id is not None:
+            stmt = stmt.where(User.id < before_id)
+        if role is not None:
+            stmt = stmt.where(User.role == role)
+        if confirmed is not None:
+            stmt = stmt.where(User.confirmed.is_(confirmed))
+        if created_from is not None:
+            stmt = stmt.where(User.created_at >= created_from)
+        if created_to is not None:
+            stmt = stmt.where(User.created_at < created_to)
+        if search:
+            # inlined, so the planner sees a constant prefix and uses the index
+            pattern = literal(escape_like(search.lower()) + "%", literal_execute=True)
+            stmt = stmt.where(
+                or_(
+                    func.lower(User.username).like(pattern, escape="\\"),
+                    func.lower(User.email).like(pattern, escape="\\"),
+                )
+            )
+        stmt = stmt.order_by(User.id.desc()).limit(limit)
+        rows = await self.db.execute(stmt)
+        return [row._asdict() for row in rows]
+
+    async def create_user(
+        self, body: UserCreate, avatar: str = None, confirm_email_host: str = None
+    ) -> User:
+        # uniqueness of username and email is enforced by the database,
+        # IntegrityError is raised to the caller on conflict
+        stmt = (
+            insert(User)
+            .values(
+                **body.model_dump(exclude_unset=True, exclude={"password"}),
+                hashed_password=body.password,
+                avatar=avatar,
+            )
+            .returning(User)
+        )
+        try:
+            result = await self.db.execute(stmt)
+        except IntegrityError:
+            await self.db.rollback()
+            raise
+        user = result.scalar_one()
+        await self.stats.change_counters(
+            user.id, {USERS_COUNTER: 1, contacts_bucket(0): 1}
+        )
+        await self.stats.add_daily(user.id, signups=1)
+        if confirm_email_host is not None:
+            # confirmation email is queued in the same transaction as the user
+            self.outbox.add(
+                EmailKind.CONFIRM_EMAIL, user.email, user.username, confirm_email_host
+            )
         await self.db.commit()
-        await self.db.refresh(user)
         return user
 
+    async def queue_email(self, kind: EmailKind, user: User, host: str) -> None:
+        await self.outbox.enqueue(kind, user.email, user.username, host)
+
     async def confirmed_email(self, email: str) -> None:
-        user = await self.get_user_by_email(email)
-        user.confirmed = True
+        stmt = (
+            update(User)
+            .where(func.lower(User.email) == email.lower(), User.confirmed.is_not(True))
+            .values(confirmed=True)
+            .returning(User.id)
+        )
+        result = await self.db.execute(stmt)
+        user_id = result.scalar_one_or_none()
+        if user_id is not None:
+            await self.stats.change_counters(user_id, {CONFIRMED_USERS_COUNTER: 1})
         await self.db.commit()
 
     async def update_avatar_url(self, email: str, url: str) -> User:
-        user = await self.get_user_by_email(email)
-        user.avatar = url
-        await self.db.commit()
-        await self.db.refresh(user)
-        return user
+        return await self._update_by_email(email, avatar=url)
 
     async def update_user_password(self, email: str, hashed_password: str) -> User:
-        user = await self.get_user_by_email(email)
-        user.hashed_password = hashed_password
+        return await self._update_by_email(email, hashed_password=hashed_password)
+
+    async def _update_by_email(self, email: str, **values) -> User | None:
+        stmt = (
+            update(User)
+            .where(func.lower(User.email) == email.lower())
+            .values(**values)
+            .returning(User)
+        )
+        result = await self.db.execute(stmt)
+        user = result.scalar_one_or_none()
         await self.db.commit()
-        await self.db.refresh(user)
         return user
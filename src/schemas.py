@@ -1,4 +1,5 @@
 from datetime import datetime, date
+from typing import List
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 
 
@@ -18,6 +19,56 @@ class ContactModelResponse(ContactModel):
     created_at: datetime
 
 
+class ContactProjection(BaseModel):
+    """Contact with the fields picked by the `fields` parameter, all by default."""
+
+    id: int | None = None
+    first_name: str | None = None
+    last_name: str | None = None
+    email: str | None = None
+    phone: str | None = None
+    date_of_birth: date | None = None
+    info: str | None = None
+    created_at: datetime | None = None
+
+
+class ContactUpdate(BaseModel):
+    first_name: str | None = Field(default=None, max_length=50)
+    last_name: str | None = Field(default=None, max_length=50)
+    email: str | None = Field(default=None, max_length=100)
+    phone: str | None = Field(default=None, max_length=20)
+    date_of_birth: date | None = None
+    info: str | None = Field(default=None, max_length=200)
+
+
+class ContactFilter(BaseModel):
+    first_name: str | None = None
+    last_name: str | None = None
+    email: str | None = None
+
+
+class ContactBatchDelete(BaseModel):
+    ids: List[int] | None = Field(None, max_length=1000)
+    filter: ContactFilter | None = None
+
+
+class ContactBatchUpdate(ContactBatchDelete):
+    values: ContactUpdate
+
+
+class ContactBatchResult(BaseModel):
+    ids: List[int]
+
+
+class ContactIds(BaseModel):
+    ids: List[int] = Field(max_length=1000)
+
+
+class ContactMultiGetResult(BaseModel):
+    contacts: List[ContactModelResponse]
+    missing: List[int]
+
+
 class User(BaseModel):
     id: int
     username: str
@@ -27,6 +78,15 @@ class User(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UserListItem(BaseModel):
+    id: int
+    username: str
+    email: str
+    role: str
+    confirmed: bool
+    created_at: datetime | None
+
+
 class UserCreate(BaseModel):
     username: str
     email: str
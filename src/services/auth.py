@@ -1,12 +1,12 @@
 from datetime import datetime, timedelta, UTC
+from functools import cache
 from typing import Optional
 
-from fastapi import Depends, HTTPException, status
-from passlib.context import CryptContext
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from jose import JWTError, jwt
 import json
+import time
 
 from src.database.db import get_db
 from src.conf.config import settings
@@ -14,22 +14,47 @@ from src.services.users import UserService
 from src.database.models import User, UserRole
 from src.schemas import User as SchemaUser
 from src.database.cache import get_cache, Cache
+from src.services.metrics import cache_requests, password_hash_duration
+from src.services.request_timing import timed
+from src.services.tracing import span, traced
+
+
+@cache
+def get_pwd_context():
+    # passlib and bcrypt are imported on the first hash, not at startup
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 class Hash:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    @property
+    def pwd_context(self):
+        return get_pwd_context()
 
     def verify_password(self, plain_password, hashed_password):
-        return self.pwd_context.verify(plain_password, hashed_password)
+        start = time.perf_counter()
+        try:
+            with timed("auth"):
+                return self.pwd_context.verify(plain_password, hashed_password)
+        finally:
+            password_hash_duration.observe("verify", value=time.perf_counter() - start)
 
     def get_password_hash(self, password: str):
-        return self.pwd_context.hash(password)
+        start = time.perf_counter()
+        try:
+            with timed("auth"):
+                return self.pwd_context.hash(password)
+        finally:
+            password_hash_duration.observe("hash", value=time.perf_counter() - start)
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
 async def create_access_token(data: dict, expires_delta: Optional[int] = None):
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(UTC) + timedelta(seconds=expires_delta)
@@ -43,6 +68,8 @@ async def create_access_token(data: dict, expires_delta: Optional[int] = None):
 
 
 def create_email_confirm_token(data: dict):
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.now(UTC) + timedelta(days=7)
     to_encode.update({"iat": datetime.now(UTC), "exp": expire})
@@ -51,6 +78,8 @@ def create_email_confirm_token(data: dict):
 
 
 def create_password_reset_token(data: dict):
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.now(UTC) + timedelta(hours=24)
     to_encode.update({"iat": datetime.now(UTC), "exp": expire, "reset_password": True})
@@ -59,6 +88,8 @@ def create_password_reset_token(data: dict):
 
 
 async def get_email_from_token(token: str):
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(
             token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
@@ -72,11 +103,15 @@ async def get_email_from_token(token: str):
         )
 
 
+@traced
 async def get_current_user(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db),
     cache: Cache = Depends(get_cache),
 ):
+    from jose import JWTError, jwt
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -84,18 +119,23 @@ async def get_current_user(
     )
 
     try:
-        payload = jwt.decode(
-            token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
-        )
+        with timed("auth"), span("jwt.decode"):
+            payload = jwt.decode(
+                token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
+            )
         username = payload["sub"]
         if username is None:
             raise credentials_exception
     except JWTError as e:
         raise credentials_exception
+    # the rate limit key of the request uses the subject decoded here
+    request.state.username = username
 
     user_service = UserService(db)
 
-    cached_user = cache.get(username)
+    with timed("cache"), span("cache.get"):
+        cached_user = cache.get(username)
+    cache_requests.inc("miss" if cached_user is None else "hit")
     user = (
         User(**json.loads(cached_user))
         if cached_user is not None
@@ -104,7 +144,8 @@ async def get_current_user(
     if user is None:
         raise credentials_exception
     if cached_user is None:
-        cache.put(username, json.dumps(user.as_dict(), default=str))
+        with timed("cache"), span("cache.put"):
+            cache.put(username, json.dumps(user.as_dict(), default=str))
 
     return user
 
@@ -1,19 +1,39 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.repository.contacts import ContactRepository
-from src.schemas import ContactModel
+from src.schemas import ContactModel, ContactFilter, ContactUpdate
+from typing import List
 from src.database.models import User
+from src.services.tracing import traced_methods
 
 
+@traced_methods
 class ContactService:
     def __init__(self, db: AsyncSession):
         self.contact_repository = ContactRepository(db)
 
-    async def get_contacts(self, skip: int, limit: int, user: User):
-        return await self.contact_repository.get_contacts(skip, limit, user)
+    async def get_contact_rows(
+        self, skip: int, limit: int, user: User, fields: List[str] | None = None
+    ):
+        return await self.contact_repository.get_contact_rows(skip, limit, user, fields)
+
+    async def count_contacts(self, user: User):
+        return await self.contact_repository.count_contacts(user)
 
     async def get_contact(self, contact_id: int, user: User):
         return await self.contact_repository.get_contact_by_id(contact_id, user)
 
+    async def get_contacts_by_ids(self, ids: List[int], user: User):
+        ids = list(dict.fromkeys(ids))
+        contacts = await self.contact_repository.get_contacts_by_ids(ids, user)
+        by_id = {contact.id: contact for contact in contacts}
+        return {
+            "contacts": [by_id[id] for id in ids if id in by_id],
+            "missing": [id for id in ids if id not in by_id],
+        }
+
+    def stream_contacts(self, user: User, after_id: int = 0):
+        return self.contact_repository.stream_contacts(user, after_id)
+
     async def create_contact(self, body: ContactModel, user: User):
         return await self.contact_repository.create_contact(body, user)
 
@@ -23,7 +43,21 @@ class ContactService:
     async def update_contact(self, contact_id: int, body: ContactModel, user: User):
         return await self.contact_repository.update_contact(contact_id, body, user)
 
-    async def search_contacts(
+    async def update_contacts(
+        self,
+        ids: List[int] | None,
+        filter: ContactFilter | None,
+        body: ContactUpdate,
+        user: User,
+    ):
+        return await self.contact_repository.update_contacts(ids, filter, body, user)
+
+    async def delete_contacts(
+        self, ids: List[int] | None, filter: ContactFilter | None, user: User
+    ):
+        return await self.contact_repository.delete_contacts(ids, filter, user)
+
+    async def search_contact_rows(
         self,
         first_name: str | None,
         last_name: str | None,
@@ -31,10 +65,13 @@ class ContactService:
         skip: int,
         limit: int,
         user: User,
+        fields: List[str] | None = None,
     ):
-        return await self.contact_repository.search_contacts(
-            first_name, last_name, email, skip, limit, user
+        return await self.contact_repository.search_contact_rows(
+            first_name, last_name, email, skip, limit, user, fields
         )
 
-    async def get_closest_brithday_contacts(self, user: User):
-        return await self.contact_repository.get_closest_brithday_contacts(user)
+    async def get_closest_birthday_rows(
+        self, user: User, fields: List[str] | None = None
+    ):
+        return await self.contact_repository.get_closest_birthday_rows(user, fields)
@@ -0,0 +1,75 @@
+import json
+from datetime import timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.cache import Cache
+from src.repository.stats import (
+    CONFIRMED_USERS_COUNTER,
+    CONTACTS_PER_USER_BUCKETS,
+    USERS_COUNTER,
+    StatsRepository,
+    bucket_label,
+    contacts_bucket,
+    today,
+)
+from src.services.request_timing import timed
+
+DASHBOARD_CACHE_KEY = "admin_dashboard"
+
+
+class DashboardService:
+    def __init__(self, db: AsyncSession, cache: Cache):
+        self.repository = StatsRepository(db)
+        self.cache = cache
+
+    async def get_dashboard(self) -> dict:
+        """
+        Get the dashboard figures from the summary tables, cached for
+        DASHBOARD_CACHE_TTL seconds.
+        """
+        with timed("cache"):
+            cached = self.cache.get(DASHBOARD_CACHE_KEY)
+        if cached:
+            return json.loads(cached)
+
+        dashboard = await self._build(settings.DASHBOARD_DAYS)
+        with timed("cache"):
+            self.cache.put(
+                DASHBOARD_CACHE_KEY,
+                json.dumps(dashboard),
+                ttl=settings.DASHBOARD_CACHE_TTL,
+            )
+        return dashboard
+
+    async def _build(self, days: int) -> dict:
+        counters = await self.repository.get_counters()
+        since = today() - timedelta(days=days - 1)
+        daily = {row.day: row for row in await self.repository.get_daily(since)}
+        days_range = [since + timedelta(days=i) for i in range(days)]
+        return {
+            "total_users": counters.get(USERS_COUNTER, 0),
+            "confirmed_users": counters.get(CONFIRMED_USERS_COUNTER, 0),
+            "contacts_per_user": [
+                {
+                    "contacts": bucket_label(lower),
+                    "users": counters.get(contacts_bucket(lower), 0),
+                }
+                for lower in CONTACTS_PER_USER_BUCKETS
+            ],
+            "signups_per_day": [
+                {
+                    "day": day.isoformat(),
+                    "count": daily[day].signups if day in daily else 0,
+                }
+                for day in days_range
+            ],
+            "contacts_created_per_day": [
+                {
+                    "day": day.isoformat(),
+                    "count": daily[day].contacts_created if day in daily else 0,
+                }
+                for day in days_range
+            ],
+        }
@@ -1,60 +1,279 @@
+import asyncio
+import contextlib
+import logging
+import time
+from email.message import EmailMessage
+from email.utils import formataddr
 from pathlib import Path
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
+from typing import TYPE_CHECKING
+
+# same range as fastapi-mail, whose ConnectionConfig configures the pool
+import aiosmtplib
 from pydantic import EmailStr
 from src.services.auth import create_email_confirm_token, create_password_reset_token
 from src.conf.config import settings
+from src.database.models import EmailKind
+from src.services.tracing import traced, traced_methods
 
-mailConnectionConfig = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=465,
-    MAIL_SERVER="smtp.meta.ua",
-    MAIL_FROM_NAME="Contacts service",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / "templates",
-)
+# fastapi_mail and jinja2 are loaded with the mail client, on the first email
+if TYPE_CHECKING:
+    from fastapi_mail import ConnectionConfig
+    from jinja2 import Template
 
+logger = logging.getLogger(__name__)
 
-async def send_confirm_email(email: EmailStr, username: str, host: str):
-    try:
-        token_verification = create_email_confirm_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email",
-            recipients=[email],
-            template_body={
-                "host": host,
-                "username": username,
-                "token": token_verification,
-            },
-            subtype=MessageType.html,
+# templates compiled and loaded once, when the mail client is created
+TEMPLATE_NAMES = ("verify_email.html", "reset_password.html")
+
+# errors after which a pooled connection can't be trusted anymore
+CONNECTION_ERRORS = (aiosmtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class SMTPPool:
+    """
+    A small pool of authenticated SMTP connections reused across messages.
+
+    Connections are opened lazily, at most `size` of them are in use at once.
+    Connections idle for longer than `idle_timeout` seconds are closed instead
+    of being reused, and a send that fails on a broken connection is retried
+    once on a newly opened one. A connection whose transaction failed is
+    reset before it goes back to the pool.
+    """
+
+    def __init__(self, config: "ConnectionConfig", size: int, idle_timeout: float):
+        self.config = config
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._idle: list[tuple[aiosmtplib.SMTP, float]] = []
+        self._semaphore: asyncio.Semaphore | None = None
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.config.MAIL_SERVER,
+            port=self.config.MAIL_PORT,
+            timeout=self.config.TIMEOUT,
+            use_tls=self.config.MAIL_SSL_TLS,
+            start_tls=self.config.MAIL_STARTTLS,
+            validate_certs=self.config.VALIDATE_CERTS,
+            local_hostname=self.config.LOCAL_HOSTNAME,
+            cert_bundle=self.config.CERT_BUNDLE,
         )
+        await smtp.connect()
+        if self.config.USE_CREDENTIALS:
+            await smtp.login(
+                self.config.MAIL_USERNAME,
+                self.config.MAIL_PASSWORD.get_secret_value(),
+            )
+        return smtp
 
-        fm = FastMail(mailConnectionConfig)
-        await fm.send_message(message, template_name="verify_email.html")
-    except ConnectionErrors as err:
-        print(err)
+    async def _acquire(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            smtp, released_at = self._idle.pop()
+            if smtp.is_connected and time.monotonic() - released_at < self.idle_timeout:
+                return smtp
+            await self._discard(smtp)
+        return await self._connect()
 
+    @staticmethod
+    async def _discard(smtp: aiosmtplib.SMTP):
+        if smtp.is_connected:
+            with contextlib.suppress(aiosmtplib.SMTPException, *CONNECTION_ERRORS):
+                await smtp.quit()
+        smtp.close()
 
-async def send_reset_email(email: EmailStr, username: str, host: str):
-    try:
-        token_verification = create_password_reset_token({"sub": email})
-        message = MessageSchema(
-            subject="Reset password",
-            recipients=[email],
-            template_body={
-                "host": host,
-                "username": username,
-                "token": token_verification,
-            },
-            subtype=MessageType.html,
+    @staticmethod
+    async def _reset(smtp: aiosmtplib.SMTP) -> bool:
+        try:
+            await smtp.rset()
+        except (aiosmtplib.SMTPException, *CONNECTION_ERRORS):
+            smtp.close()
+            return False
+        return True
+
+    @contextlib.asynccontextmanager
+    async def connection(self, fresh: bool = False):
+        """Borrow a pooled connection, or a newly opened one if `fresh` is set."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        async with self._semaphore:
+            smtp = await (self._connect() if fresh else self._acquire())
+            try:
+                yield smtp
+            except CONNECTION_ERRORS:
+                smtp.close()
+                raise
+            except aiosmtplib.SMTPException:
+                # the server refused the message, the transaction may be open
+                if await self._reset(smtp):
+                    self._idle.append((smtp, time.monotonic()))
+                raise
+            except BaseException:
+                smtp.close()
+                raise
+            else:
+                self._idle.append((smtp, time.monotonic()))
+
+    async def send(self, message: EmailMessage):
+        try:
+            async with self.connection() as smtp:
+                await smtp.send_message(message)
+        except CONNECTION_ERRORS:
+            # pooled connection was dropped by the server, other idle ones
+            # may be dropped too, so the retry opens a new connection
+            async with self.connection(fresh=True) as smtp:
+                await smtp.send_message(message)
+
+    async def close(self):
+        while self._idle:
+            smtp, _ = self._idle.pop()
+            await self._discard(smtp)
+
+
+@traced_methods
+class MailClient:
+    """
+    Long-lived mail client, renders templates and sends messages through `SMTPPool`.
+
+    Templates are loaded from a shared Jinja environment once, compiled
+    bytecode is cached on disk so other processes skip the compilation.
+    """
+
+    def __init__(
+        self,
+        config: "ConnectionConfig",
+        pool_size: int,
+        idle_timeout: float,
+        template_cache_dir: str | None = None,
+    ):
+        from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+        self.config = config
+        self.pool = SMTPPool(config, pool_size, idle_timeout)
+        self.template_env = Environment(
+            loader=FileSystemLoader(config.TEMPLATE_FOLDER),
+            bytecode_cache=FileSystemBytecodeCache(template_cache_dir),
+            auto_reload=False,
+        )
+        self.templates: dict[str, "Template"] = {
+            name: self.template_env.get_template(name) for name in TEMPLATE_NAMES
+        }
+        self.rendered = 0
+        self.render_seconds = 0.0
+
+    def render(self, template_name: str, template_body: dict) -> str:
+        template = self.templates.get(template_name)
+        if template is None:
+            template = self.template_env.get_template(template_name)
+
+        start = time.perf_counter()
+        html = template.render(**template_body)
+        elapsed = time.perf_counter() - start
+
+        self.rendered += 1
+        self.render_seconds += elapsed
+        logger.debug("Rendered %s in %.3f ms", template_name, elapsed * 1000)
+        return html
+
+    def build_message(
+        self, subject: str, recipient: str, template_name: str, template_body: dict
+    ) -> EmailMessage:
+        html = self.render(template_name, template_body)
+
+        message = EmailMessage()
+        message["Subject"] = subject
+        message["From"] = formataddr(
+            (self.config.MAIL_FROM_NAME, self.config.MAIL_FROM)
         )
+        message["To"] = recipient
+        message.set_content(html, subtype="html")
+        return message
+
+    async def send_template(
+        self, subject: str, recipient: str, template_name: str, template_body: dict
+    ):
+        # rendered before a pooled connection is taken, so the connection
+        # is only held for the SMTP exchange itself
+        message = self.build_message(subject, recipient, template_name, template_body)
+        await self.pool.send(message)
+
+    async def close(self):
+        await self.pool.close()
+
+
+def create_connection_config() -> "ConnectionConfig":
+    from fastapi_mail import ConnectionConfig
+
+    return ConnectionConfig(
+        MAIL_USERNAME=settings.MAIL_USERNAME,
+        MAIL_PASSWORD=settings.MAIL_PASSWORD,
+        MAIL_FROM=settings.MAIL_FROM,
+        MAIL_PORT=settings.MAIL_PORT,
+        MAIL_SERVER=settings.MAIL_SERVER,
+        MAIL_FROM_NAME="Contacts service",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True,
+        TIMEOUT=settings.MAIL_TIMEOUT,
+        TEMPLATE_FOLDER=Path(__file__).parent / "templates",
+    )
+
+
+mail_client: MailClient = None
+
+
+def get_mail_client() -> MailClient:
+    global mail_client
+    if mail_client is None:
+        mail_client = MailClient(
+            create_connection_config(),
+            settings.MAIL_POOL_SIZE,
+            settings.MAIL_POOL_IDLE_TIMEOUT,
+            settings.MAIL_TEMPLATE_CACHE_DIR,
+        )
+
+    return mail_client
+
+
+async def close_mail_client():
+    if mail_client is not None:
+        await mail_client.close()
+
+
+async def send_confirm_email(email: EmailStr, username: str, host: str):
+    token_verification = create_email_confirm_token({"sub": email})
+    await get_mail_client().send_template(
+        "Confirm your email",
+        email,
+        "verify_email.html",
+        {
+            "host": host,
+            "username": username,
+            "token": token_verification,
+        },
+    )
+
+
+async def send_reset_email(email: EmailStr, username: str, host: str):
+    token_verification = create_password_reset_token({"sub": email})
+    await get_mail_client().send_template(
+        "Reset password",
+        email,
+        "reset_password.html",
+        {
+            "host": host,
+            "username": username,
+            "token": token_verification,
+        },
+    )
+
+
+EMAIL_SENDERS = {
+    EmailKind.CONFIRM_EMAIL: send_confirm_email,
+    EmailKind.RESET_PASSWORD: send_reset_email,
+}
+
 
-        fm = FastMail(mailConnectionConfig)
-        await fm.send_message(message, template_name="reset_password.html")
-    except ConnectionErrors as err:
-        print(err)
+@traced
+async def send_email(kind: EmailKind, email: EmailStr, username: str, host: str):
+    await EMAIL_SENDERS[kind](email, username, host)
@@ -0,0 +1,175 @@
+"""
+Delivery worker for the email outbox, runs as a separate process:
+
+    python -m src.services.email_outbox
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.cache import Cache
+from src.database.db import sessionmanager
+from src.database.models import EmailOutbox
+from src.repository.email_outbox import EmailOutboxRepository, utcnow
+from src.services.email import close_mail_client, send_email
+
+logger = logging.getLogger(__name__)
+
+
+QUEUE_DEPTH_CACHE_KEY = "email_outbox_queue_depth"
+
+
+class EmailOutboxService:
+    def __init__(self, db: AsyncSession, cache: Cache | None = None):
+        self.repository = EmailOutboxRepository(db)
+        self.cache = cache
+
+    async def get_stats(self):
+        return await self.repository.get_stats()
+
+    async def get_queue_depth(self):
+        """
+        Get the queue depth, cached for METRICS_QUEUE_DEPTH_TTL seconds
+        when the service has a cache, so frequent scrapes share one query.
+        """
+        if self.cache is None:
+            return await self.repository.get_queue_depth()
+
+        cached = self.cache.get(QUEUE_DEPTH_CACHE_KEY)
+        if cached:
+            return tuple(json.loads(cached))
+        depth = await self.repository.get_queue_depth()
+        self.cache.put(
+            QUEUE_DEPTH_CACHE_KEY,
+            json.dumps(depth),
+            ttl=settings.METRICS_QUEUE_DEPTH_TTL,
+        )
+        return depth
+
+
+class EmailOutboxWorker:
+    """
+    Claims batches of queued emails and sends them with bounded concurrency.
+
+    Failed emails are retried with exponential backoff until `max_attempts`
+    is reached, after which they are marked as failed. The lease has to
+    outlast sending a whole batch, results of emails whose lease expired
+    are dropped.
+    """
+
+    def __init__(
+        self,
+        session_factory=sessionmanager.session,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        concurrency: int = settings.OUTBOX_CONCURRENCY,
+        max_attempts: int = settings.OUTBOX_MAX_ATTEMPTS,
+        retry_base_seconds: int = settings.OUTBOX_RETRY_BASE_SECONDS,
+        lease_seconds: int = settings.OUTBOX_LEASE_SECONDS,
+        poll_interval: float = settings.OUTBOX_POLL_INTERVAL,
+        send_timeout: int = settings.MAIL_TIMEOUT,
+    ):
+        # emails of a batch are sent in ceil(batch_size / concurrency) rounds
+        batch_seconds = -(-batch_size // concurrency) * send_timeout
+        if lease_seconds < batch_seconds:
+            raise ValueError(
+                f"The lease of {lease_seconds} s is shorter than a batch can take, "
+                f"{batch_seconds} s: raise OUTBOX_LEASE_SECONDS or lower "
+                "OUTBOX_BATCH_SIZE"
+            )
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+
+    def retry_at(self, attempts: int) -> datetime | None:
+        if attempts >= self.max_attempts:
+            return None
+        delay = self.retry_base_seconds * 2 ** (attempts - 1)
+        return utcnow() + timedelta(seconds=delay)
+
+    async def _deliver(
+        self, email: EmailOutbox, semaphore: asyncio.Semaphore
+    ) -> Exception | None:
+        async with semaphore:
+            try:
+                await send_email(
+                    email.kind, email.recipient, email.username, email.host
+                )
+            except Exception as err:
+                logger.warning(
+                    "Failed to send %s email %s (attempt %s): %r",
+                    email.kind.value,
+                    email.id,
+                    email.attempts,
+                    err,
+                )
+                return err
+        return None
+
+    async def run_once(self) -> int:
+        """
+        Claim and deliver one batch of emails.
+
+        Returns:
+            The number of claimed emails.
+        """
+        async with self.session_factory() as session:
+            emails = await EmailOutboxRepository(session).claim_batch(
+                self.batch_size, self.lease_seconds
+            )
+        if not emails:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        errors = await asyncio.gather(
+            *(self._deliver(email, semaphore) for email in emails)
+        )
+
+        sent_ids = []
+        failures = []
+        for email, error in zip(emails, errors):
+            if error is None:
+                sent_ids.append(email.id)
+            else:
+                failures.append((email.id, repr(error), self.retry_at(email.attempts)))
+
+        async with self.session_factory() as session:
+            lost = await EmailOutboxRepository(session).record_results(
+                emails[0].next_attempt_at, sent_ids, failures
+            )
+        if lost:
+            logger.warning("Lease expired before %s results were stored", lost)
+
+        logger.info("Sent %s emails, %s failed", len(sent_ids), len(failures))
+        return len(emails)
+
+    async def run(self):
+        while True:
+            try:
+                claimed = await self.run_once()
+            except Exception:
+                logger.exception("Email outbox batch failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+
+async def main():
+    logging.basicConfig(level=logging.INFO)
+    try:
+        await EmailOutboxWorker().run()
+    finally:
+        await close_mail_client()
+        await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
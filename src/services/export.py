@@ -0,0 +1,54 @@
+import csv
+import io
+from typing import AsyncIterator
+
+from src.database.models import Contact
+from src.schemas import ContactModelResponse
+
+EXPORT_FIELDS = [
+    "id",
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "date_of_birth",
+    "info",
+    "created_at",
+]
+
+# number of rows joined into one chunk of the response body
+CHUNK_SIZE = 100
+
+
+async def contacts_to_ndjson(contacts: AsyncIterator[Contact]) -> AsyncIterator[str]:
+    """
+    Serialize a stream of Contacts as newline-delimited JSON, one Contact per line.
+    """
+    chunk = []
+    async for contact in contacts:
+        chunk.append(ContactModelResponse.model_validate(contact).model_dump_json())
+        if len(chunk) == CHUNK_SIZE:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+async def contacts_to_csv(contacts: AsyncIterator[Contact]) -> AsyncIterator[str]:
+    """
+    Serialize a stream of Contacts as CSV with a header row.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+
+    rows = 0
+    async for contact in contacts:
+        writer.writerow([getattr(contact, field) for field in EXPORT_FIELDS])
+        rows += 1
+        if rows == CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue()
@@ -0,0 +1,194 @@
+"""
+Memory diagnostics of the current worker: tracemalloc snapshots and
+their diffs, garbage collector statistics and live objects per type.
+
+Tracing and snapshots live in the memory of one worker process, every
+response carries its `pid`. With SERVER_WORKERS > 1 the whole flow
+(start, snapshots, diffs, stop) has to reach the same worker, e.g. run a
+single worker while investigating or check that the `pid` stays the same.
+"""
+
+import gc
+import os
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+
+from src.conf.config import settings
+
+# allocations of the diagnostics themselves are noise in the results
+IGNORED_FILES = (
+    tracemalloc.__file__,
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+    "<unknown>",
+)
+
+
+def format_frame(frame: tracemalloc.Frame) -> str:
+    return f"{frame.filename}:{frame.lineno}"
+
+
+class MemoryDiagnostics:
+    def __init__(self, max_snapshots: int):
+        self.max_snapshots = max_snapshots
+        # id -> (taken_at, snapshot, size, count), totals are summed once
+        self.snapshots: OrderedDict[
+            int, tuple[float, tracemalloc.Snapshot, int, int]
+        ] = OrderedDict()
+        self.next_id = 1
+        # handlers run in the threadpool
+        self.lock = threading.Lock()
+
+    def start(self, frames: int) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return self.status()
+
+    def stop(self) -> dict:
+        tracemalloc.stop()
+        with self.lock:
+            self.snapshots.clear()
+        return self.status()
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "pid": os.getpid(),
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_current": current,
+            "traced_peak": peak,
+            "tracemalloc_overhead": tracemalloc.get_tracemalloc_memory(),
+            "snapshots": self.list_snapshots(),
+        }
+
+    def take_snapshot(self) -> dict:
+        """
+        Take a snapshot of traced allocations, oldest snapshots are dropped
+        once there are more than `max_snapshots`.
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in IGNORED_FILES]
+        )
+        size = sum(trace.size for trace in snapshot.traces)
+        count = len(snapshot.traces)
+        taken_at = time.time()
+        with self.lock:
+            snapshot_id = self.next_id
+            self.next_id += 1
+            self.snapshots[snapshot_id] = (taken_at, snapshot, size, count)
+            while len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popitem(last=False)
+        return {
+            "pid": os.getpid(),
+            "id": snapshot_id,
+            "taken_at": taken_at,
+            "size": size,
+            "count": count,
+        }
+
+    def list_snapshots(self) -> list[dict]:
+        with self.lock:
+            entries = list(self.snapshots.items())
+        return [
+            {"id": snapshot_id, "taken_at": taken_at, "size": size, "count": count}
+            for snapshot_id, (taken_at, _, size, count) in entries
+        ]
+
+    def get_snapshot(self, snapshot_id: int) -> tracemalloc.Snapshot | None:
+        with self.lock:
+            entry = self.snapshots.get(snapshot_id)
+        return entry[1] if entry else None
+
+    def top(self, snapshot_id: int, key_type: str, limit: int) -> list[dict] | None:
+        """
+        Get the allocation sites holding the most memory.
+
+        Args:
+            snapshot_id: The id of the snapshot.
+            key_type: "lineno", "filename" or "traceback".
+            limit: The number of sites to return.
+
+        Returns:
+            The worker pid and the sites with their size and number of
+            blocks, or None if there is no such snapshot.
+        """
+        snapshot = self.get_snapshot(snapshot_id)
+        if snapshot is None:
+            return None
+        return {
+            "pid": os.getpid(),
+            "sites": [
+                {
+                    "traceback": [format_frame(frame) for frame in stat.traceback],
+                    "size": stat.size,
+                    "count": stat.count,
+                }
+                for stat in snapshot.statistics(key_type)[:limit]
+            ],
+        }
+
+    def diff(
+        self, snapshot_id: int, base_id: int, key_type: str, limit: int
+    ) -> list[dict] | None:
+        """
+        Get the allocation sites which grew the most between two snapshots.
+
+        Args:
+            snapshot_id: The id of the newer snapshot.
+            base_id: The id of the snapshot to compare with.
+            key_type: "lineno", "filename" or "traceback".
+            limit: The number of sites to return.
+
+        Returns:
+            The worker pid and the sites with their size and number of
+            blocks and the change of both, or None if either snapshot
+            does not exist.
+        """
+        snapshot = self.get_snapshot(snapshot_id)
+        base = self.get_snapshot(base_id)
+        if snapshot is None or base is None:
+            return None
+        return {
+            "pid": os.getpid(),
+            "sites": [
+                {
+                    "traceback": [format_frame(frame) for frame in stat.traceback],
+                    "size": stat.size,
+                    "size_diff": stat.size_diff,
+                    "count": stat.count,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in snapshot.compare_to(base, key_type)[:limit]
+            ],
+        }
+
+
+def gc_stats(limit: int) -> dict:
+    """
+    Get garbage collector statistics and the most common types of live objects.
+
+    Walks all objects tracked by the garbage collector, so it takes a while
+    on a large heap.
+    """
+    objects = gc.get_objects()
+    types = Counter(
+        f"{type(obj).__module__}.{type(obj).__qualname__}" for obj in objects
+    )
+    del objects
+    return {
+        "pid": os.getpid(),
+        "counts": gc.get_count(),
+        "thresholds": gc.get_threshold(),
+        "generations": gc.get_stats(),
+        "garbage": len(gc.garbage),
+        "tracked_objects": types.total(),
+        "types": [
+            {"type": name, "count": count} for name, count in types.most_common(limit)
+        ],
+    }
+
+
+memory_diagnostics = MemoryDiagnostics(settings.MEMORY_MAX_SNAPSHOTS)
@@ -0,0 +1,427 @@
+"""
+Process-local metrics rendered in the Prometheus text format.
+
+Every worker process keeps its own values in memory, so recording a value
+is a dict update under a lock. When METRICS_DIR is set, a background
+thread of every worker writes a snapshot of its values to that directory
+every METRICS_FLUSH_INTERVAL seconds, and the scraped worker writes one on
+scrape; /metrics merges the snapshots of all workers, so the numbers are
+aggregated across uvicorn workers. On scrape, snapshots of finished workers
+are folded into one aggregate file, so counters don't go back when a worker
+is recycled and the directory doesn't grow with every recycled worker;
+their gauges are dropped.
+"""
+
+import bisect
+import contextlib
+import fcntl
+import json
+import os
+import threading
+import time
+from typing import Callable, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.conf.config import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SNAPSHOT_PREFIX = "metrics_"
+AGGREGATE_NAME = f"{SNAPSHOT_PREFIX}finished.json"
+LOCK_NAME = ".lock"
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def samples(self) -> list:
+        with self.lock:
+            return [[list(labels), value] for labels, value in self.values.items()]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, *labels: str, value: float):
+        with self.lock:
+            self.values[labels] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels: str, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            histogram = self.values.get(labels)
+            if histogram is None:
+                # counts per bucket with the last one for +Inf, sum, count
+                histogram = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self.values[labels] = histogram
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def samples(self) -> list:
+        with self.lock:
+            return [
+                [list(labels), [list(counts), total, count]]
+                for labels, (counts, total, count) in self.values.items()
+            ]
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge_sample(metric_type: str, current, value):
+    if current is None:
+        return value
+    if metric_type == "histogram":
+        counts = [a + b for a, b in zip(current[0], value[0])]
+        return [counts, current[1] + value[1], current[2] + value[2]]
+    return current + value
+
+
+def merge_snapshots(snapshots: Iterable[dict], gauges: bool = True) -> dict:
+    """Sum the samples of `snapshots`, leaving gauges out unless `gauges` is set."""
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            if metric["type"] == "gauge" and not gauges:
+                continue
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                target["samples"][key] = merge_sample(
+                    metric["type"], target["samples"].get(key), value
+                )
+    for metric in merged.values():
+        metric["samples"] = [
+            [list(labels), value] for labels, value in metric["samples"].items()
+        ]
+    return merged
+
+
+def write_json(path: str, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values, extra: dict | None = None) -> str:
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return (
+        "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+    )
+
+
+class Registry:
+    def __init__(self, directory: str | None = None, flush_interval: float = 5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.metrics: dict[str, Metric] = {}
+        self.collectors: list[Callable[[], None]] = []
+        self.pid = None
+        self.snapshot_name = None
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def collector(self, collect: Callable[[], None]):
+        """Register a callback which updates gauges before each snapshot."""
+        self.collectors.append(collect)
+        return collect
+
+    def snapshot(self) -> dict:
+        for collect in self.collectors:
+            collect()
+        return {
+            metric.name: {
+                "type": metric.type,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "samples": metric.samples(),
+            }
+            for metric in self.metrics.values()
+        }
+
+    def start(self):
+        """Start writing snapshots in the background, once per process."""
+        if self.directory and self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.stopping.clear()
+                    self.thread = threading.Thread(
+                        target=self._run, name="metrics-flush", daemon=True
+                    )
+                    self.thread.start()
+
+    def _run(self):
+        while not self.stopping.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Stop the background thread and write the final snapshot."""
+        with self.lock:
+            if self.thread is None:
+                return
+            self.stopping.set()
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            if self.pid != os.getpid():
+                # the start time keeps a reused pid from overwriting a finished worker
+                self.pid = os.getpid()
+                self.snapshot_name = (
+                    f"{SNAPSHOT_PREFIX}{self.pid}_{time.time_ns()}.json"
+                )
+            write_json(
+                os.path.join(self.directory, self.snapshot_name), self.snapshot()
+            )
+
+    @contextlib.contextmanager
+    def directory_lock(self):
+        """Serialize scrapes of all workers, so a snapshot is folded only once."""
+        with open(os.path.join(self.directory, LOCK_NAME), "w") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def read_snapshots(self) -> list[tuple[str, bool, dict]]:
+        """Snapshots of every worker as (file name, worker is alive, values)."""
+        snapshots = []
+        for name in sorted(os.listdir(self.directory)):
+            if (
+                not name.startswith(SNAPSHOT_PREFIX)
+                or not name.endswith(".json")
+                or name == AGGREGATE_NAME
+            ):
+                continue
+            pid = int(name[len(SNAPSHOT_PREFIX) :].split("_")[0])
+            try:
+                with open(os.path.join(self.directory, name)) as file:
+                    snapshots.append((name, is_alive(pid), json.load(file)))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def fold_finished(self, snapshots: list[tuple[str, bool, dict]]) -> dict:
+        """
+        Merge snapshots of finished workers into the aggregate file and
+        remove them.
+
+        The aggregate lists the files it already holds, so a snapshot left
+        behind by an interrupted fold is removed without being counted twice.
+
+        Returns:
+            The aggregated values of all finished workers.
+        """
+        path = os.path.join(self.directory, AGGREGATE_NAME)
+        try:
+            with open(path) as file:
+                aggregate = json.load(file)
+        except FileNotFoundError:
+            aggregate = {"folded": [], "metrics": {}}
+
+        finished = [name for name, alive, _ in snapshots if not alive]
+        folded = set(aggregate["folded"])
+        new = [
+            snapshot
+            for name, alive, snapshot in snapshots
+            if not alive and name not in folded
+        ]
+        if new:
+            aggregate = {
+                # names already removed can't show up again and are forgotten
+                "folded": finished,
+                "metrics": merge_snapshots([aggregate["metrics"], *new], gauges=False),
+            }
+            write_json(path, aggregate)
+        for name in finished:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.directory, name))
+        return aggregate["metrics"]
+
+    def collect(self) -> dict:
+        """Values of all metrics, merged across workers when METRICS_DIR is set."""
+        if not self.directory:
+            return self.snapshot()
+
+        self.flush()
+        with self.directory_lock():
+            snapshots = self.read_snapshots()
+            finished = self.fold_finished(snapshots)
+        return merge_snapshots(
+            [finished, *(snapshot for _, alive, snapshot in snapshots if alive)]
+        )
+
+    def render(self, extra: Iterable[Metric] = ()) -> str:
+        metrics = self.collect()
+        for metric in extra:
+            metrics[metric.name] = {
+                "type": metric.type,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": [],
+                "samples": metric.samples(),
+            }
+
+        lines = []
+        for name, metric in metrics.items():
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            names = metric["labelnames"]
+            for labels, value in metric["samples"]:
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{format_labels(names, labels)} {value}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                bounds = [str(bound) for bound in metric["buckets"]] + ["+Inf"]
+                for bound, bucket in zip(bounds, counts):
+                    cumulative += bucket
+                    label_text = format_labels(names, labels, {"le": bound})
+                    lines.append(f"{name}_bucket{label_text} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(names, labels)} {total}")
+                lines.append(f"{name}_count{format_labels(names, labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def clear_snapshots(directory: str):
+    """Remove snapshots of a previous server run, called before workers start."""
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.startswith(SNAPSHOT_PREFIX):
+            os.remove(os.path.join(directory, name))
+
+
+registry = Registry(settings.METRICS_DIR, settings.METRICS_FLUSH_INTERVAL)
+
+http_requests = registry.register(
+    Counter("http_requests_total", "HTTP requests.", ("method", "route", "status"))
+)
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency, including streaming of the body.",
+        ("method", "route"),
+    )
+)
+db_queries = registry.register(
+    Counter("db_queries_total", "SQL statements executed.", ("operation",))
+)
+db_query_duration = registry.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "SQL statement execution time.",
+        ("operation",),
+        (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+    )
+)
+db_pool_connections = registry.register(
+    Gauge(
+        "db_pool_connections",
+        "Connections of the SQLAlchemy pool by state.",
+        ("state",),
+    )
+)
+cache_requests = registry.register(
+    Counter("cache_requests_total", "Cache lookups.", ("result",))
+)
+password_hash_duration = registry.register(
+    Histogram(
+        "password_hash_duration_seconds",
+        "Time spent hashing and verifying passwords with bcrypt.",
+        ("operation",),
+    )
+)
+
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Count and time SQL statements and report pool usage of `engine`."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        # a failed statement never reaches after_cursor_execute
+        conn = context.connection
+        if context.execution_context is not None and conn is not None:
+            starts = conn.info.get("query_start")
+            if starts:
+                starts.pop()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        duration = time.perf_counter() - conn.info["query_start"].pop()
+        operation = statement.lstrip()[:6].upper()
+        if operation not in SQL_OPERATIONS:
+            operation = "OTHER"
+        db_queries.inc(operation)
+        db_query_duration.observe(operation, value=duration)
+
+    @registry.collector
+    def collect_pool():
+        pool = sync_engine.pool
+        if not hasattr(pool, "checkedout"):
+            return
+        db_pool_connections.set("checked_out", value=pool.checkedout())
+        db_pool_connections.set("idle", value=pool.checkedin())
+        db_pool_connections.set("size", value=pool.size())
+        db_pool_connections.set("overflow", value=max(pool.overflow(), 0))
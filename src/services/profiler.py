@@ -0,0 +1,222 @@
+"""
+Statistical sampling profiler producing collapsed stacks.
+
+A background thread reads the current frames of the profiled threads every
+`interval` seconds and counts identical stacks. The output is the
+"collapsed" format, one `frame;frame;frame count` line per stack, which
+flamegraph.pl, speedscope and inferno render directly.
+
+In "wall" mode every sample is counted, so time spent waiting shows up.
+In "cpu" mode a sample is counted only if the thread used CPU time since
+the previous sample.
+
+A request runs on the event loop thread together with other requests, so
+a per-request profile also contains work of concurrent requests.
+"""
+
+import asyncio
+import contextlib
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+PROFILE_MODES = ("wall", "cpu")
+
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+def collapse(frame) -> list[str]:
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+def thread_cpu_time(thread_id: int) -> float | None:
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(thread_id))
+    except (AttributeError, OSError):
+        return None
+
+
+class SamplingProfiler:
+    def __init__(
+        self,
+        thread_ids: list[int] | None = None,
+        interval: float = 0.005,
+        mode: str = "wall",
+    ):
+        """
+        Args:
+            thread_ids: Threads to sample, all threads of the process if None.
+            interval: Seconds between samples.
+            mode: "wall" or "cpu".
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode}")
+        self.thread_ids = thread_ids
+        self.interval = interval
+        self.mode = mode
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._cpu_times = {}
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.monotonic() - self.started_at
+        return self
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _on_cpu(self, thread_id: int) -> bool:
+        cpu_time = thread_cpu_time(thread_id)
+        if cpu_time is None:
+            return True
+        previous = self._cpu_times.get(thread_id)
+        self._cpu_times[thread_id] = cpu_time
+        return previous is not None and cpu_time > previous
+
+    def sample(self):
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            if self.thread_ids is not None and thread_id not in self.thread_ids:
+                continue
+            if self.mode == "cpu" and not self._on_cpu(thread_id):
+                continue
+            stack = collapse(frame)
+            if self.thread_ids is None or len(self.thread_ids) > 1:
+                stack.insert(0, names.get(thread_id, str(thread_id)))
+            self.stacks[";".join(stack)] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+def profile_file_name(mode: str, label: str) -> str:
+    safe_label = "".join(c if c.isalnum() else "_" for c in label).strip("_")
+    return (
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{os.getpid()}-"
+        f"{mode}-{safe_label}.collapsed"
+    )
+
+
+def save_profile(
+    directory: str,
+    profiler: SamplingProfiler,
+    label: str,
+    name: str | None = None,
+    keep: int | None = None,
+) -> str:
+    """
+    Store collapsed stacks in `directory` and return the file name.
+
+    When `keep` is set, the oldest profiles beyond the newest `keep` are removed.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = name or profile_file_name(profiler.mode, label)
+    with open(os.path.join(directory, name), "w") as file:
+        file.write(profiler.collapsed())
+    if keep is not None:
+        prune_profiles(directory, keep)
+    return name
+
+
+def prune_profiles(directory: str, keep: int):
+    # file names start with the time they were taken at
+    names = sorted(
+        entry.name
+        for entry in os.scandir(directory)
+        if entry.name.endswith(".collapsed")
+    )
+    for name in names[: max(len(names) - keep, 0)]:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(directory, name))
+
+
+class ProfilingSession:
+    """A time-boxed profile of all threads of this worker, stored when it ends."""
+
+    def __init__(self):
+        self.profiler: SamplingProfiler | None = None
+        self.ends_at = 0.0
+        self.file_name: str | None = None
+        self.task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(
+        self,
+        seconds: float,
+        mode: str,
+        interval: float,
+        directory: str,
+        keep: int | None = None,
+    ):
+        self.profiler = SamplingProfiler(None, interval, mode)
+        self.ends_at = time.monotonic() + seconds
+        self.file_name = None
+        self.profiler.start()
+        self.task = asyncio.create_task(self._finish_after(seconds, directory, keep))
+
+    async def _finish_after(self, seconds: float, directory: str, keep: int | None):
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.profiler.stop()
+            self.file_name = save_profile(directory, self.profiler, "worker", keep=keep)
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "pid": os.getpid(),
+            "mode": self.profiler.mode if self.profiler else None,
+            "seconds_left": max(self.ends_at - time.monotonic(), 0.0),
+            "file": self.file_name,
+        }
+
+
+profiling_session = ProfilingSession()
+
+
+def list_profiles(directory: str) -> list[dict]:
+    if not os.path.isdir(directory):
+        return []
+    return [
+        {"name": entry.name, "size": entry.stat().st_size}
+        for entry in sorted(os.scandir(directory), key=lambda entry: entry.name)
+        if entry.name.endswith(".collapsed")
+    ]
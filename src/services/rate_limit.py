@@ -0,0 +1,72 @@
+import functools
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from limits import parse
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from src.conf.config import settings
+
+
+def rate_limit_key(request: Request) -> str:
+    """
+    Rate limit key made of the client IP and the authenticated username.
+
+    Users behind one IP get separate limits, and a stolen token can't spend
+    the limit of its owner from another address. The username is the one
+    get_current_user has already taken from the token, so requests to routes
+    without authentication share the limit of their IP.
+    """
+    username = getattr(request.state, "username", None) or "anonymous"
+    return f"{get_remote_address(request)}:{username}"
+
+
+# one limiter shared by all routers, counters live in Redis so limits hold
+# across workers and restarts; when Redis is down the limits are enforced
+# per process until it comes back
+limiter = Limiter(
+    key_func=rate_limit_key,
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+    strategy=settings.RATE_LIMIT_STRATEGY,
+    in_memory_fallback_enabled=True,
+    key_prefix="rate_limit",
+)
+
+
+def rate_limit(policy: str):
+    """
+    Apply the limit configured for `policy` in RATE_LIMITS to a route.
+
+    The limiter talks to Redis with a blocking client, so the check runs
+    in the threadpool rather than on the event loop. slowapi has no public
+    API for that, the private names used here are pinned with the slowapi
+    version and covered by tests/test_rate_limit.py.
+    """
+    limit = limiter.limit(settings.RATE_LIMITS[policy])
+
+    def decorator(func):
+        limited = limit(func)
+
+        @functools.wraps(limited)
+        async def wrapper(*args, request: Request, **kwargs):
+            if limiter.enabled:
+                await run_in_threadpool(
+                    limiter._check_request_limit, request, func, False
+                )
+                # tells the slowapi wrapper the limit is already checked
+                request.state._rate_limiting_complete = True
+            return await limited(*args, request=request, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def limit_description(policy: str) -> str:
+    """Route description stating the limit of `policy`."""
+    item = parse(settings.RATE_LIMITS[policy])
+    period = item.GRANULARITY.name
+    if item.multiples > 1:
+        period = f"{item.multiples} {period}s"
+    return f"No more than {item.amount} requests per {period}"
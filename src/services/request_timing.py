@@ -0,0 +1,85 @@
+"""
+Request-scoped timing of database, cache and auth work.
+
+ServerTimingMiddleware puts a RequestTimings into `current_timings` for each
+request; the engine listeners and `timed` blocks add to it from anywhere in
+the request, including sync dependencies run in the threadpool.
+"""
+
+import contextlib
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+TIMING_KINDS = ("db", "cache", "auth")
+
+
+class RequestTimings:
+    def __init__(self):
+        self.durations = dict.fromkeys(TIMING_KINDS, 0.0)
+        self.queries = 0
+        self.statements = Counter()
+
+    def add(self, kind: str, duration: float):
+        self.durations[kind] += duration
+
+    def add_query(self, statement: str, duration: float):
+        self.queries += 1
+        self.statements[statement] += 1
+        self.durations["db"] += duration
+
+    def server_timing(self) -> str:
+        entries = []
+        for kind, duration in self.durations.items():
+            entry = f"{kind};dur={duration * 1000:.2f}"
+            if kind == "db":
+                entry += f';desc="{self.queries} queries"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+    def repeated_statements(self, threshold: int) -> list[tuple[str, int]]:
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+current_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "current_timings", default=None
+)
+
+
+@contextlib.contextmanager
+def timed(kind: str):
+    """Add the time spent in the block to `kind` of the current request."""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(kind, time.perf_counter() - start)
+
+
+def track_engine(engine: AsyncEngine):
+    """Record statements executed by `engine` into the current request."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if current_timings.get() is not None:
+            conn.info.setdefault("request_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        timings = current_timings.get()
+        if timings is not None and conn.info.get("request_query_start"):
+            start = conn.info["request_query_start"].pop()
+            # statements are parameterized, so the text is the shape of the query
+            timings.add_query(statement, time.perf_counter() - start)
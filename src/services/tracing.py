@@ -0,0 +1,259 @@
+"""
+Lightweight tracing spans exported in the Zipkin v2 JSON format.
+
+TracingMiddleware samples a share of requests and opens a root span for
+them; `span` blocks and `traced` functions inside the request become its
+children. When a request is not sampled, entering a span is a single
+context variable lookup, so instrumentation can stay in place with
+sampling off. Each finished trace is written as one JSON array of spans
+per line, ready to be posted to a Zipkin compatible collector. Writing
+happens on a background thread, so the event loop never waits for I/O.
+"""
+
+import contextlib
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+
+from src.conf.config import settings
+
+
+class Span:
+    __slots__ = (
+        "trace",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "tags",
+        "start",
+        "duration",
+    )
+
+    def __init__(self, trace: list, trace_id: str, parent_id: str | None, name: str):
+        self.trace = trace
+        self.trace_id = trace_id
+        self.span_id = random_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = None
+        self.tags = {}
+        self.start = time.time()
+        self.duration = None
+
+    def child(self, name: str) -> "Span":
+        return Span(self.trace, self.trace_id, self.span_id, name)
+
+    def set_tag(self, key: str, value):
+        self.tags[key] = str(value)
+
+    def finish(self):
+        self.duration = time.time() - self.start
+        self.trace.append(self)
+
+    def to_zipkin(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "id": self.span_id,
+            "name": self.name,
+            "timestamp": int(self.start * 1_000_000),
+            "duration": max(int(self.duration * 1_000_000), 1),
+            "localEndpoint": {"serviceName": settings.TRACE_SERVICE_NAME},
+        }
+        if self.parent_id:
+            span["parentId"] = self.parent_id
+        if self.kind:
+            span["kind"] = self.kind
+        if self.tags:
+            span["tags"] = self.tags
+        return span
+
+
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def random_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+class Exporter:
+    """
+    Write finished traces to stdout or append them to a file.
+
+    Traces are queued and written by a background thread. When the writer
+    falls `max_queue` traces behind, new traces are dropped and counted.
+    """
+
+    def __init__(self, path: str | None = None, max_queue: int = 10_000):
+        self.path = path
+        self.queue: queue.Queue[list[Span] | None] = queue.Queue(max_queue)
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.thread: threading.Thread | None = None
+
+    def export(self, spans: list[Span]):
+        if self.thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._run, name="trace-exporter", daemon=True
+                )
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            traces = [self.queue.get()]
+            # write everything queued meanwhile in one go
+            while not self.queue.empty():
+                traces.append(self.queue.get_nowait())
+            lines = [
+                json.dumps([span.to_zipkin() for span in spans]) + "\n"
+                for spans in traces
+                if spans is not None
+            ]
+            try:
+                self._write("".join(lines))
+            finally:
+                for _ in traces:
+                    self.queue.task_done()
+            if None in traces:
+                return
+
+    def _write(self, text: str):
+        if not text:
+            return
+        if self.path is None:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        else:
+            with open(self.path, "a") as file:
+                file.write(text)
+
+    def flush(self):
+        """Wait until every queued trace is written."""
+        self.queue.join()
+
+    def close(self):
+        with self.lock:
+            if self.thread is None:
+                return
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+
+class Tracer:
+    def __init__(self, sample_rate: float, exporter: Exporter):
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def should_sample(self, sampled: str | None = None) -> bool:
+        """
+        Decide whether to trace a request.
+
+        Args:
+            sampled: The decision of a trusted upstream service, if any.
+                It is ignored while tracing is disabled.
+        """
+        if not self.enabled:
+            return False
+        if sampled is not None:
+            return sampled == "1"
+        return random.random() < self.sample_rate
+
+    def start_trace(
+        self, name: str, trace_id: str | None = None, parent_id: str | None = None
+    ) -> Span:
+        span = Span([], trace_id or random_id(16), parent_id, name)
+        span.kind = "SERVER"
+        return span
+
+    def end_trace(self, root: Span):
+        root.finish()
+        self.exporter.export(root.trace)
+
+
+tracer = Tracer(
+    settings.TRACE_SAMPLE_RATE,
+    Exporter(None if settings.TRACE_EXPORTER == "stdout" else settings.TRACE_FILE),
+)
+
+
+@contextlib.contextmanager
+def span(name: str, **tags):
+    """Record the block as a child of the current span, if the request is sampled."""
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = parent.child(name)
+    for key, value in tags.items():
+        child.set_tag(key, value)
+    token = current_span.set(child)
+    try:
+        yield child
+    except Exception as err:
+        child.set_tag("error", repr(err))
+        raise
+    finally:
+        current_span.reset(token)
+        child.finish()
+
+
+def traced(func=None, *, name: str | None = None):
+    """Record every call of a sync or async function as a span."""
+    if func is None:
+        return functools.partial(traced, name=name)
+
+    span_name = name or func.__qualname__
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if current_span.get() is None:
+                return await func(*args, **kwargs)
+            with span(span_name):
+                return await func(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if current_span.get() is None:
+            return func(*args, **kwargs)
+        with span(span_name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def traced_methods(cls):
+    """Trace all public methods of a class, except generators."""
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith("_") or not inspect.isfunction(value):
+            continue
+        if inspect.isasyncgenfunction(value) or inspect.isgeneratorfunction(value):
+            continue
+        setattr(cls, attr, traced(value))
+    return cls
@@ -1,24 +1,209 @@
-import cloudinary
-import cloudinary.uploader
+import asyncio
+import functools
+import hashlib
+import io
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
 
+from fastapi import HTTPException, UploadFile, status
 
-class UploadFileService:
+from src.conf.config import settings
+from src.services.tracing import traced_methods
+
+CHUNK_SIZE = 64 * 1024
+AVATAR_SIZE = 250
+
+# leading bytes of the image formats accepted as avatars
+IMAGE_SIGNATURES = (
+    b"\xff\xd8\xff",  # jpeg
+    b"\x89PNG\r\n\x1a\n",  # png
+    b"GIF87a",
+    b"GIF89a",
+)
+
+# uploads run in their own threads, so slow uploads can't exhaust
+# the threadpool FastAPI uses for sync dependencies
+upload_executor = ThreadPoolExecutor(
+    max_workers=settings.UPLOAD_WORKERS, thread_name_prefix="upload"
+)
+
+
+@functools.cache
+def configure_cloudinary(cloud_name, api_key, api_secret):
+    import cloudinary
+
+    cloudinary.config(
+        cloud_name=cloud_name,
+        api_key=api_key,
+        api_secret=api_secret,
+        secure=True,
+    )
+
+
+def is_image(head: bytes) -> bool:
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return True
+    return head.startswith(IMAGE_SIGNATURES)
+
+
+def resize_image(data: bytes, size: int, path: str):
+    """
+    Crop `data` to a square, resize it to `size` x `size` and save as JPEG to `path`.
+
+    Runs in a worker process, so the CPU-bound decoding and resizing
+    doesn't hold the GIL of the web worker.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        image.save(tmp_path, "JPEG", quality=85, optimize=True)
+    os.replace(tmp_path, path)
+
+
+class AvatarStorage(ABC):
+    @abstractmethod
+    async def save(self, file: UploadFile, username: str) -> str:
+        """Store a validated avatar image and return its public url."""
+        pass
+
+    def close(self):
+        """Release resources held by the storage, called on shutdown."""
+        pass
+
+
+@traced_methods
+class CloudinaryStorage(AvatarStorage):
     def __init__(self, cloud_name, api_key, api_secret):
-        self.cloud_name = cloud_name
-        self.api_key = api_key
-        self.api_secret = api_secret
-        cloudinary.config(
-            cloud_name=self.cloud_name,
-            api_key=self.api_key,
-            api_secret=self.api_secret,
-            secure=True,
+        configure_cloudinary(cloud_name, api_key, api_secret)
+
+    async def save(self, file: UploadFile, username: str) -> str:
+        import cloudinary
+        import cloudinary.uploader
+
+        public_id = f"RestApp/{username}"
+        loop = asyncio.get_running_loop()
+        r = await loop.run_in_executor(
+            upload_executor,
+            functools.partial(
+                cloudinary.uploader.upload,
+                file.file,
+                public_id=public_id,
+                overwrite=True,
+            ),
         )
+        return cloudinary.CloudinaryImage(public_id).build_url(
+            width=AVATAR_SIZE, height=AVATAR_SIZE, crop="fill", version=r.get("version")
+        )
+
+
+@traced_methods
+class LocalStorage(AvatarStorage):
+    """
+    Stores resized avatars in a local directory served under `base_url`.
+
+    Files are named by the hash of the uploaded content, so identical uploads
+    are processed and stored once, and a stored file never changes.
+    """
+
+    def __init__(self, directory: str, base_url: str, workers: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.base_url = base_url.rstrip("/")
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    async def save(self, file: UploadFile, username: str) -> str:
+        data = await file.read()
+        name = f"{hashlib.sha256(data).hexdigest()}.jpg"
+        path = self.directory / name
+
+        if not path.exists():
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(
+                    self.executor, resize_image, data, AVATAR_SIZE, str(path)
+                )
+            except OSError:
+                # valid signature but undecodable content, PIL's
+                # UnidentifiedImageError is an OSError
+                raise HTTPException(
+                    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                    detail="File is not a valid image",
+                )
+        return f"{self.base_url}/{name}"
+
+    def close(self):
+        self.executor.shutdown()
+
+
+avatar_storage: AvatarStorage = None
+
+
+def get_avatar_storage() -> AvatarStorage:
+    global avatar_storage
+    if avatar_storage is None:
+        if settings.AVATAR_STORAGE == "local":
+            avatar_storage = LocalStorage(
+                settings.AVATAR_LOCAL_DIR,
+                settings.AVATAR_BASE_URL,
+                settings.AVATAR_RESIZE_WORKERS,
+            )
+        else:
+            avatar_storage = CloudinaryStorage(
+                settings.CLOUDINARY_NAME,
+                settings.CLOUDINARY_API_KEY,
+                settings.CLOUDINARY_API_SECRET,
+            )
+
+    return avatar_storage
+
+
+def close_avatar_storage():
+    global avatar_storage
+    if avatar_storage is not None:
+        avatar_storage.close()
+        avatar_storage = None
+
+
+@traced_methods
+class UploadFileService:
+    def __init__(self, storage: AvatarStorage):
+        self.storage = storage
 
     @staticmethod
-    def upload_file(file, username) -> str:
-        public_id = f"RestApp/{username}"
-        r = cloudinary.uploader.upload(file.file, public_id=public_id, overwrite=True)
-        src_url = cloudinary.CloudinaryImage(public_id).build_url(
-            width=250, height=250, crop="fill", version=r.get("version")
+    async def validate_image(file: UploadFile, max_size: int):
+        """
+        Reject non-image and oversized files, reading at most one chunk at a time.
+        """
+        unsupported = HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Only JPEG, PNG, GIF and WebP images are allowed",
         )
-        return src_url
+        too_large = HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"File is larger than {max_size} bytes",
+        )
+
+        if file.content_type and not file.content_type.startswith("image/"):
+            raise unsupported
+        if file.size is not None and file.size > max_size:
+            raise too_large
+
+        head = await file.read(CHUNK_SIZE)
+        if not is_image(head):
+            raise unsupported
+
+        size = len(head)
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_size:
+                raise too_large
+        await file.seek(0)
+
+    async def upload_file(self, file: UploadFile, username) -> str:
+        await self.validate_image(file, settings.AVATAR_MAX_SIZE)
+        return await self.storage.save(file, username)
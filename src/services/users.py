@@ -1,14 +1,31 @@
+import logging
+
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.repository.users import UserRepository
 from src.schemas import UserCreate
-from libgravatar import Gravatar
+from src.database.models import User, EmailKind
+from src.database.cache import Cache
+from src.conf.config import settings
+from src.services.request_timing import timed
+from src.services.tracing import traced_methods
+
+logger = logging.getLogger(__name__)
+
+
+def email_window_key(kind: EmailKind, email: str) -> str:
+    return f"email:{kind.value}:{email.lower()}"
 
 
+@traced_methods
 class UserService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, cache: Cache | None = None):
         self.repository = UserRepository(db)
+        self.cache = cache
+
+    async def create_user(self, body: UserCreate, host: str):
+        from libgravatar import Gravatar
 
-    async def create_user(self, body: UserCreate):
         avatar = None
         try:
             g = Gravatar(body.email)
@@ -16,7 +33,9 @@ class UserService:
         except Exception as e:
             print(e)
 
-        return await self.repository.create_user(body, avatar)
+        user = await self.repository.create_user(body, avatar, host)
+        self._start_email_window(EmailKind.CONFIRM_EMAIL, user.email)
+        return user
 
     async def get_user_by_id(self, user_id: int):
         return await self.repository.get_user_by_id(user_id)
@@ -27,11 +46,56 @@ class UserService:
     async def get_user_by_email(self, email: str):
         return await self.repository.get_user_by_email(email)
 
+    async def user_exists(self, username: str, email: str) -> bool:
+        return await self.repository.user_exists(username, email)
+
+    async def list_user_rows(self, limit: int, before_id: int | None = None, **filters):
+        return await self.repository.list_user_rows(limit, before_id, **filters)
+
+    async def request_confirm_email(self, user: User, host: str):
+        await self._queue_email(EmailKind.CONFIRM_EMAIL, user, host)
+
+    async def request_reset_email(self, user: User, host: str):
+        await self._queue_email(EmailKind.RESET_PASSWORD, user, host)
+
+    async def _queue_email(self, kind: EmailKind, user: User, host: str):
+        # a request within the window of a previous one reuses its queued email
+        if not self._start_email_window(kind, user.email):
+            return
+        try:
+            await self.repository.queue_email(kind, user, host)
+        except BaseException:
+            # nothing was queued, so a retry must not be coalesced away
+            self._end_email_window(kind, user.email)
+            raise
+
+    def _start_email_window(self, kind: EmailKind, email: str) -> bool:
+        if self.cache is None:
+            return True
+        try:
+            with timed("cache"):
+                return self.cache.add(
+                    email_window_key(kind, email), 1, settings.EMAIL_COALESCE_SECONDS
+                )
+        except RedisError:
+            # without the cache emails are not coalesced, but still sent
+            logger.warning("Can't open the email window", exc_info=True)
+            return True
+
+    def _end_email_window(self, kind: EmailKind, email: str):
+        if self.cache is None:
+            return
+        try:
+            with timed("cache"):
+                self.cache.delete(email_window_key(kind, email))
+        except RedisError:
+            logger.warning("Can't close the email window", exc_info=True)
+
     async def confirmed_email(self, email: str):
         return await self.repository.confirmed_email(email)
 
     async def update_avatar_url(self, email: str, url: str):
         return await self.repository.update_avatar_url(email, url)
-    
+
     async def update_user_password(self, email: str, hashed_password: str):
         return await self.repository.update_user_password(email, hashed_password)
@@ -35,13 +35,45 @@ class TestCache(Cache):
     def get(self, key):
         return None
 
-    def put(self, key, value):
+    def put(self, key, value, ttl=3600):
+        pass
+
+    def add(self, key, value, ttl):
+        return True
+
+    def delete(self, key):
         pass
 
 
 test_cache = TestCache()
 
 
+class DictCache(Cache):
+    """In-process cache with the semantics of RedisCache, including NX `add`."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def put(self, key, value, ttl=3600):
+        self.data[key] = value
+        self.ttls[key] = ttl
+
+    def add(self, key, value, ttl):
+        if key in self.data:
+            return False
+        self.data[key] = value
+        self.ttls[key] = ttl
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+        self.ttls.pop(key, None)
+
+
 @pytest.fixture(scope="module", autouse=True)
 def init_models_wrap():
     async def init_models():
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from main import app, origins
+from src.database.models import User, UserRole
+from src.repository.users import UserRepository
+from src.services.auth import get_current_admin_user
+from tests.conftest import TestingSessionLocal, test_user
+
+ADMIN_USERS = [
+    ("alice", "alice@corp.test", UserRole.ADMIN, True),
+    ("alan", "alan@corp.test", UserRole.USER, False),
+    ("bob", "bob@mail.test", UserRole.USER, True),
+    ("al_x", "x@mail.test", UserRole.USER, True),
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def admin_users(client):
+    async def create_users():
+        async with TestingSessionLocal() as session:
+            for username, email, role, confirmed in ADMIN_USERS:
+                session.add(
+                    User(
+                        username=username,
+                        email=email,
+                        hashed_password="hash",
+                        role=role,
+                        confirmed=confirmed,
+                    )
+                )
+            await session.commit()
+
+    asyncio.run(create_users())
+
+
+async def list_users(**kwargs) -> list[dict]:
+    async with TestingSessionLocal() as session:
+        return await UserRepository(session).list_user_rows(**kwargs)
+
+
+@pytest.mark.asyncio
+async def test_keyset_pagination_walks_all_users():
+    first_page = await list_users(limit=3)
+    second_page = await list_users(limit=3, before_id=first_page[-1]["id"])
+
+    ids = [row["id"] for row in first_page + second_page]
+    assert ids == sorted(ids, reverse=True)
+    assert len(ids) == len(ADMIN_USERS) + 1
+    assert "hashed_password" not in first_page[0]
+
+
+@pytest.mark.asyncio
+async def test_filters_and_prefix_search():
+    admins = await list_users(limit=10, role=UserRole.ADMIN)
+    unconfirmed = await list_users(limit=10, confirmed=False)
+    al = await list_users(limit=10, search="AL")
+    mail = await list_users(limit=10, search="bob@")
+
+    assert [row["username"] for row in admins] == ["alice"]
+    assert [row["username"] for row in unconfirmed] == ["alan"]
+    assert {row["username"] for row in al} == {"alice", "alan", "al_x"}
+    assert [row["username"] for row in mail] == ["bob"]
+
+
+@pytest.mark.asyncio
+async def test_search_escapes_like_wildcards():
+    rows = await list_users(limit=10, search="al_")
+
+    assert [row["username"] for row in rows] == ["al_x"]
+
+
+def test_get_users_endpoint(client):
+    app.dependency_overrides[get_current_admin_user] = lambda: None
+    try:
+        response = client.get(
+            "/admin/users",
+            params={"limit": 2, "confirmed": "true"},
+            headers={"Origin": origins[0]},
+        )
+    finally:
+        del app.dependency_overrides[get_current_admin_user]
+
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert [row["username"] for row in data] == ["al_x", "bob"]
+    assert data[0]["role"] == "user"
+    assert response.headers["X-Next-Before-Id"] == str(data[-1]["id"])
+    assert "X-Next-Before-Id" in response.headers["access-control-expose-headers"]
+    assert test_user["username"] not in {row["username"] for row in data}
@@ -0,0 +1,80 @@
+import io
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers, UploadFile
+
+from main import CachedStaticFiles
+from src.services.upload_file import LocalStorage, UploadFileService
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def create_upload(color: str = "red", size=(400, 300)) -> UploadFile:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    buffer.seek(0)
+    return upload_file(buffer)
+
+
+def upload_file(buffer: io.BytesIO) -> UploadFile:
+    return UploadFile(
+        buffer,
+        filename="avatar.png",
+        headers=Headers({"content-type": "image/png"}),
+    )
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = LocalStorage(tmp_path, "/static/avatars", workers=1)
+    yield storage
+    storage.close()
+
+
+@pytest.mark.asyncio
+async def test_local_storage_resizes_avatar(storage, tmp_path):
+    url = await UploadFileService(storage).upload_file(create_upload(), "tester")
+
+    name = url.removeprefix("/static/avatars/")
+    assert url.startswith("/static/avatars/") and name.endswith(".jpg")
+    with Image.open(tmp_path / name) as image:
+        assert image.size == (250, 250)
+        assert image.format == "JPEG"
+
+
+@pytest.mark.asyncio
+async def test_local_storage_deduplicates_content(storage, tmp_path):
+    service = UploadFileService(storage)
+
+    first = await service.upload_file(create_upload(), "first")
+    second = await service.upload_file(create_upload(), "second")
+    other = await service.upload_file(create_upload("blue"), "third")
+
+    assert first == second
+    assert first != other
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+@pytest.mark.asyncio
+async def test_local_storage_rejects_undecodable_image(storage, tmp_path):
+    garbage = io.BytesIO(b"\x89PNG\r\n\x1a\n" + b"garbage" * 100)
+
+    with pytest.raises(HTTPException) as error:
+        await UploadFileService(storage).upload_file(upload_file(garbage), "tester")
+
+    assert error.value.status_code == 415
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_avatars_are_cached_forever(tmp_path):
+    (tmp_path / "avatars").mkdir()
+    (tmp_path / "avatars" / "cached.jpg").write_bytes(b"avatar")
+    app = FastAPI()
+    app.mount("/static", CachedStaticFiles(directory=tmp_path))
+
+    response = TestClient(app).get("/static/avatars/cached.jpg")
+
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
@@ -0,0 +1,85 @@
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.api.compression import CompressionMiddleware, accepted_encodings
+
+PAYLOAD = b'{"first_name": "John", "last_name": "Doe"}' * 100
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+
+@app.get("/large")
+def large():
+    return Response(PAYLOAD, media_type="application/json")
+
+
+@app.get("/small")
+def small():
+    return Response(PAYLOAD[:100], media_type="application/json")
+
+
+@app.get("/image")
+def image():
+    return Response(PAYLOAD, media_type="image/jpeg")
+
+
+@app.get("/stream")
+def stream():
+    return StreamingResponse(
+        (PAYLOAD[:100] for _ in range(10)), media_type="application/x-ndjson"
+    )
+
+
+client = TestClient(app)
+gzip_headers = {"Accept-Encoding": "gzip"}
+
+
+def test_large_response_is_compressed():
+    response = client.get("/large", headers=gzip_headers)
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(PAYLOAD)
+    assert response.content == PAYLOAD
+
+
+def test_brotli_is_preferred():
+    response = client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["content-encoding"] == "br"
+    assert response.content == PAYLOAD
+
+
+def test_small_response_is_not_compressed():
+    response = client.get("/small", headers=gzip_headers)
+
+    assert "content-encoding" not in response.headers
+    assert response.content == PAYLOAD[:100]
+
+
+def test_compressed_content_is_skipped():
+    response = client.get("/image", headers=gzip_headers)
+
+    assert "content-encoding" not in response.headers
+    assert response.content == PAYLOAD
+
+
+def test_streaming_response_is_compressed():
+    response = client.get("/stream", headers=gzip_headers)
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.content == PAYLOAD[:100] * 10
+
+
+def test_identity_when_not_accepted():
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+    assert response.content == PAYLOAD
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, br;q=0, deflate;q=0.5") == {"gzip", "deflate"}
@@ -3,7 +3,7 @@ from unittest.mock import AsyncMock, MagicMock
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.repository.contacts import ContactRepository
 from src.database.models import User, Contact
-from src.schemas import ContactModel
+from src.schemas import ContactModel, ContactFilter, ContactUpdate
 from datetime import date
 
 
@@ -24,32 +24,31 @@ def user():
 
 
 @pytest.mark.asyncio
-async def test_get_all_contacts(
+async def test_get_contact_by_id(
     user: User, contact_repository: ContactRepository, mock_session: AsyncMock
 ):
     mock_result = MagicMock()
-    mock_result.scalars.return_value.all.return_value = [create_contact(user)]
+    mock_result.scalar_one_or_none.return_value = create_contact(user)
     mock_session.execute = AsyncMock(return_value=mock_result)
 
-    contacts = await contact_repository.get_contacts(user=user, skip=0, limit=10)
+    contact = await contact_repository.get_contact_by_id(contact_id=1, user=user)
 
-    assert len(contacts) == 1
-    assert contacts[0].first_name == "John"
+    assert contact is not None
+    assert contact.id == 1
+    assert contact.first_name == "John"
 
 
 @pytest.mark.asyncio
-async def test_get_contact_by_id(
+async def test_count_contacts(
     user: User, contact_repository: ContactRepository, mock_session: AsyncMock
 ):
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = create_contact(user)
+    mock_result.scalar_one_or_none.return_value = None
     mock_session.execute = AsyncMock(return_value=mock_result)
 
-    contact = await contact_repository.get_contact_by_id(contact_id=1, user=user)
+    total = await contact_repository.count_contacts(user=user)
 
-    assert contact is not None
-    assert contact.id == 1
-    assert contact.first_name == "John"
+    assert total == 0
 
 
 @pytest.mark.asyncio
@@ -59,20 +58,28 @@ async def test_create_contact(
     contact_model = create_contact_model()
 
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = Contact(
-        id=1,
-        first_name=contact_model.first_name,
-        last_name=contact_model.last_name,
-        email=contact_model.email,
-        phone=contact_model.phone,
-        user=user,
+    mock_result.scalars.return_value.all.return_value = [
+        Contact(
+            id=1,
+            first_name=contact_model.first_name,
+            last_name=contact_model.last_name,
+            email=contact_model.email,
+            phone=contact_model.phone,
+            user=user,
+        )
+    ]
+    mock_session.execute = AsyncMock(
+        side_effect=[mock_result, counter_result(1), MagicMock(), MagicMock()]
     )
-    mock_session.execute = AsyncMock(return_value=mock_result)
 
     result = await contact_repository.create_contact(body=contact_model, user=user)
 
     assert isinstance(result, Contact)
     assert result.first_name == "John"
+    # insert, counter update, move to the "1-9" bucket and daily stats
+    assert mock_session.execute.await_count == 4
+    mock_session.commit.assert_awaited_once()
+    mock_session.refresh.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -82,8 +89,8 @@ async def test_delete_contact(
     existing_contact = create_contact(user=user)
 
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = existing_contact
-    mock_session.execute = AsyncMock(return_value=mock_result)
+    mock_result.scalars.return_value.all.return_value = [existing_contact]
+    mock_session.execute = AsyncMock(side_effect=[mock_result, counter_result(5)])
 
     result = await contact_repository.delete_contact(
         contact_id=existing_contact.id, user=user
@@ -91,7 +98,27 @@ async def test_delete_contact(
 
     assert result is not None
     assert result.first_name == "John"
-    mock_session.delete.assert_awaited_once_with(existing_contact)
+    # delete and counter update, the user stays in the same bucket
+    assert mock_session.execute.await_count == 2
+    mock_session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_create_contact_on_postgres_is_one_statement(
+    user: User, contact_repository: ContactRepository, mock_session: AsyncMock
+):
+    mock_session.bind.dialect.name = "postgresql"
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = [create_contact(user)]
+    mock_session.execute = AsyncMock(return_value=mock_result)
+
+    result = await contact_repository.create_contact(
+        body=create_contact_model(), user=user
+    )
+
+    assert result.first_name == "John"
+    # counter, bucket and daily upserts are CTEs of the insert
+    assert mock_session.execute.await_count == 1
     mock_session.commit.assert_awaited_once()
 
 
@@ -111,24 +138,86 @@ async def test_update_contact(
 
     assert result is not None
     assert result.first_name == "John"
+    mock_session.execute.assert_awaited_once()
     mock_session.commit.assert_awaited_once()
-    mock_session.refresh.assert_awaited_once_with(existing_contact_model)
+    mock_session.refresh.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_search_contact_rows(
+    user: User, contact_repository: ContactRepository, mock_session: AsyncMock
+):
+    row = MagicMock()
+    row._asdict.return_value = {"id": 1, "first_name": "John"}
+    mock_session.execute = AsyncMock(return_value=[row])
+
+    rows = await contact_repository.search_contact_rows(
+        user=user, first_name="John", last_name=None, email=None, skip=0, limit=10
+    )
+
+    assert rows == [{"id": 1, "first_name": "John"}]
+    stmt = mock_session.execute.call_args[0][0]
+    assert stmt.compile().params["first_name_1"] == "John"
+
+
+@pytest.mark.asyncio
+async def test_get_contact_rows_selects_fields(
+    user: User, contact_repository: ContactRepository, mock_session: AsyncMock
+):
+    row = MagicMock()
+    row._asdict.return_value = {"id": 1, "email": "john@doe.me"}
+    mock_session.execute = AsyncMock(return_value=[row])
+
+    rows = await contact_repository.get_contact_rows(
+        skip=0, limit=10, user=user, fields=["id", "email"]
+    )
+
+    assert rows == [{"id": 1, "email": "john@doe.me"}]
+    stmt = mock_session.execute.call_args[0][0]
+    assert [column.name for column in stmt.selected_columns] == ["id", "email"]
 
 
 @pytest.mark.asyncio
-async def test_search_contacts(
+async def test_update_contacts(
     user: User, contact_repository: ContactRepository, mock_session: AsyncMock
 ):
     mock_result = MagicMock()
-    mock_result.scalars.return_value.all.return_value = [create_contact(user)]
+    mock_result.scalars.return_value.all.return_value = [1, 2]
     mock_session.execute = AsyncMock(return_value=mock_result)
 
-    contacts = await contact_repository.search_contacts(
-        user=user, first_name="John", last_name=None, email=None, skip=0, limit=10
+    result = await contact_repository.update_contacts(
+        ids=[1, 2, 3], filter=None, body=ContactUpdate(info="Family"), user=user
     )
 
-    assert len(contacts) == 1
-    assert contacts[0].first_name == "John"
+    assert result == [1, 2]
+    mock_session.execute.assert_awaited_once()
+    mock_session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_delete_contacts(
+    user: User, contact_repository: ContactRepository, mock_session: AsyncMock
+):
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = [1]
+    mock_session.execute = AsyncMock(
+        side_effect=[mock_result, counter_result(9), MagicMock()]
+    )
+
+    result = await contact_repository.delete_contacts(
+        ids=None, filter=ContactFilter(first_name="John"), user=user
+    )
+
+    assert result == [1]
+    # delete, counter update and move from the "10-49" to the "1-9" bucket
+    assert mock_session.execute.await_count == 3
+    mock_session.commit.assert_awaited_once()
+
+
+def counter_result(total: int) -> MagicMock:
+    result = MagicMock()
+    result.scalar_one.return_value = total
+    return result
 
 
 def create_contact(user: User) -> Contact:
@@ -0,0 +1,120 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import Contact, User
+from src.repository.contacts import ContactRepository
+from src.repository.stats import STATS_SHARDS, StatsRepository
+from src.repository.users import UserRepository
+from src.schemas import ContactModel, UserCreate
+from src.services.dashboard import DashboardService
+from tests.conftest import DictCache, TestingSessionLocal
+
+
+def contact_model(number: int) -> ContactModel:
+    return ContactModel(
+        first_name=f"John{number}",
+        last_name="Doe",
+        email=f"john{number}@test.me",
+        phone="034 434 23 54",
+        date_of_birth="1990-01-01",
+        info="Friend",
+    )
+
+
+@pytest.mark.asyncio
+async def test_dashboard_follows_repository_writes():
+    async with TestingSessionLocal() as session:
+        users = UserRepository(session)
+        contacts = ContactRepository(session)
+        first = await users.create_user(
+            UserCreate(username="stats1", email="stats1@test.me", password="12345678")
+        )
+        await users.create_user(
+            UserCreate(username="stats2", email="stats2@test.me", password="12345678")
+        )
+        await users.confirmed_email("stats1@test.me")
+        await users.confirmed_email("stats1@test.me")
+        for number in range(10):
+            await contacts.create_contact(contact_model(number), first)
+        await contacts.delete_contacts(None, None, first)
+        await contacts.create_contact(contact_model(10), first)
+
+        cache = DictCache()
+        dashboard = await DashboardService(session, cache).get_dashboard()
+
+    assert dashboard["total_users"] == 2
+    assert dashboard["confirmed_users"] == 1
+    buckets = {row["contacts"]: row["users"] for row in dashboard["contacts_per_user"]}
+    assert buckets["0"] == 1
+    assert buckets["1-9"] == 1
+    assert buckets["10-49"] == 0
+    assert sum(row["count"] for row in dashboard["signups_per_day"]) == 2
+    assert sum(row["count"] for row in dashboard["contacts_created_per_day"]) == 11
+    assert cache.ttls == {"admin_dashboard": 30}
+
+
+@pytest.mark.asyncio
+async def test_dashboard_is_served_from_cache():
+    cache = DictCache()
+    cache.put("admin_dashboard", '{"total_users": 42}')
+
+    async with TestingSessionLocal() as session:
+        dashboard = await DashboardService(session, cache).get_dashboard()
+
+    assert dashboard == {"total_users": 42}
+
+
+@pytest.mark.asyncio
+async def test_counters_are_written_in_name_order():
+    session = AsyncMock(spec=AsyncSession)
+    session.bind.dialect.name = "sqlite"
+
+    await StatsRepository(session).change_counters(
+        21, {"contacts_per_user:1": 1, "contacts_per_user:0": -1}
+    )
+
+    stmt = session.execute.await_args.args[0]
+    params = stmt.compile().params
+    assert [params["name_m0"], params["name_m1"]] == [
+        "contacts_per_user:0",
+        "contacts_per_user:1",
+    ]
+    assert params["shard_m0"] == 21 % STATS_SHARDS
+
+
+@pytest.mark.asyncio
+async def test_counters_are_summed_over_shards():
+    async with TestingSessionLocal() as session:
+        stats = StatsRepository(session)
+        await stats.change_counters(1, {"sharded": 2})
+        await stats.change_counters(2, {"sharded": 3})
+        await stats.change_counters(STATS_SHARDS + 1, {"sharded": 4})
+        counters = await stats.get_counters()
+        await session.rollback()
+
+    assert counters["sharded"] == 9
+
+
+@pytest.mark.parametrize("sign, ids_only", [(1, False), (-1, True)])
+def test_postgres_contact_write_is_one_statement(sign, ids_only):
+    session = AsyncMock(spec=AsyncSession)
+    session.bind.dialect.name = "postgresql"
+    user = User(id=7)
+    if sign > 0:
+        stmt = insert(Contact).values(first_name="John", user_id=user.id)
+    else:
+        stmt = delete(Contact).where(Contact.user_id == user.id)
+
+    counted = ContactRepository(session)._counted_statement(
+        stmt, user, sign, int(sign > 0), ids_only
+    )
+
+    sql = str(counted.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("WITH written AS")
+    assert "INSERT INTO contact_counters" in sql
+    assert "INSERT INTO stat_counters" in sql
+    assert ("INSERT INTO daily_stats" in sql) == (sign > 0)
@@ -0,0 +1,122 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select, update
+
+from src.database.models import EmailOutbox, EmailKind, EmailStatus
+from src.repository.email_outbox import EmailOutboxRepository
+from src.services.email_outbox import EmailOutboxWorker
+from tests.conftest import TestingSessionLocal
+
+
+@pytest_asyncio.fixture
+async def outbox():
+    async with TestingSessionLocal() as session:
+        await session.execute(delete(EmailOutbox))
+        repository = EmailOutboxRepository(session)
+        await repository.enqueue(
+            EmailKind.CONFIRM_EMAIL, "first@test.me", "first", "http://test/"
+        )
+        await repository.enqueue(
+            EmailKind.RESET_PASSWORD, "second@test.me", "second", "http://test/"
+        )
+
+
+async def get_emails():
+    async with TestingSessionLocal() as session:
+        emails = await session.execute(select(EmailOutbox).order_by(EmailOutbox.id))
+        return emails.scalars().all()
+
+
+def create_worker(max_attempts: int = 3) -> EmailOutboxWorker:
+    return EmailOutboxWorker(
+        session_factory=TestingSessionLocal,
+        batch_size=10,
+        concurrency=2,
+        max_attempts=max_attempts,
+        retry_base_seconds=0,
+        lease_seconds=60,
+        poll_interval=0,
+        send_timeout=10,
+    )
+
+
+@pytest.mark.asyncio
+async def test_worker_sends_batch(outbox, monkeypatch):
+    mock_send_email = AsyncMock()
+    monkeypatch.setattr("src.services.email_outbox.send_email", mock_send_email)
+
+    claimed = await create_worker().run_once()
+
+    assert claimed == 2
+    assert mock_send_email.await_count == 2
+    emails = await get_emails()
+    assert [email.status for email in emails] == [EmailStatus.SENT] * 2
+    assert all(email.sent_at is not None for email in emails)
+
+    assert await create_worker().run_once() == 0
+
+
+@pytest.mark.asyncio
+async def test_worker_retries_and_gives_up(outbox, monkeypatch):
+    mock_send_email = AsyncMock(side_effect=ConnectionError("SMTP is down"))
+    monkeypatch.setattr("src.services.email_outbox.send_email", mock_send_email)
+    worker = create_worker(max_attempts=2)
+
+    await worker.run_once()
+    emails = await get_emails()
+    assert [email.status for email in emails] == [EmailStatus.PENDING] * 2
+    assert "SMTP is down" in emails[0].last_error
+
+    await worker.run_once()
+    emails = await get_emails()
+    assert [email.status for email in emails] == [EmailStatus.FAILED] * 2
+    assert [email.attempts for email in emails] == [2, 2]
+
+
+def test_lease_must_cover_batch():
+    with pytest.raises(ValueError):
+        EmailOutboxWorker(
+            session_factory=TestingSessionLocal,
+            batch_size=50,
+            concurrency=5,
+            lease_seconds=300,
+            send_timeout=60,
+        )
+
+
+@pytest.mark.asyncio
+async def test_results_after_lost_lease_are_dropped(outbox):
+    async with TestingSessionLocal() as session:
+        repository = EmailOutboxRepository(session)
+        emails = await repository.claim_batch(10, lease_seconds=60)
+        first, second = sorted(emails, key=lambda email: email.id)
+        lease_until = first.next_attempt_at
+        # the lease of the first email expired and another worker claimed it
+        await session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id == first.id)
+            .values(next_attempt_at=lease_until + timedelta(seconds=60))
+        )
+        await session.commit()
+
+        lost = await repository.record_results(lease_until, [first.id, second.id], [])
+
+    assert lost == 1
+    emails = await get_emails()
+    assert [email.status for email in emails] == [
+        EmailStatus.SENDING,
+        EmailStatus.SENT,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_outbox_stats(outbox):
+    async with TestingSessionLocal() as session:
+        stats = await EmailOutboxRepository(session).get_stats()
+
+    assert stats["queued"] == 2
+    assert stats["failed"] == 0
+    assert stats["latency_avg"] == 0.0
@@ -0,0 +1,191 @@
+import asyncio
+import time
+from email.message import EmailMessage
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import aiosmtplib
+import pytest
+import pytest_asyncio
+from fastapi_mail import ConnectionConfig
+
+from src.services.email import MailClient
+
+
+class FakeSMTPServer:
+    """Minimal local SMTP stand-in which records connections and messages."""
+
+    def __init__(self):
+        self.connections = 0
+        self.resets = 0
+        self.messages = []
+        self.writers = []
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self.writers.append(writer)
+        writer.write(b"220 localhost ESMTP\r\n")
+        while line := await reader.readline():
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO"):
+                writer.write(b"250-localhost\r\n250 AUTH PLAIN LOGIN\r\n")
+            elif command.startswith("AUTH"):
+                writer.write(b"235 Authentication successful\r\n")
+            elif command == "DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                await writer.drain()
+                data = await reader.readuntil(b"\r\n.\r\n")
+                self.messages.append(data.decode())
+                writer.write(b"250 OK\r\n")
+            elif command.startswith("RCPT TO") and "REJECTED" in command:
+                writer.write(b"550 User unknown\r\n")
+            elif command == "RSET":
+                self.resets += 1
+                writer.write(b"250 OK\r\n")
+            elif command == "QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+    def drop_connections(self):
+        for writer in self.writers:
+            writer.close()
+
+
+@pytest_asyncio.fixture
+async def smtp_server():
+    fake = FakeSMTPServer()
+    server = await asyncio.start_server(fake.handle, "127.0.0.1", 0)
+    fake.port = server.sockets[0].getsockname()[1]
+    yield fake
+    server.close()
+
+
+def create_mail_client(port: int, idle_timeout: float = 60) -> MailClient:
+    config = ConnectionConfig(
+        MAIL_USERNAME="user",
+        MAIL_PASSWORD="password",
+        MAIL_FROM="service@test.me",
+        MAIL_PORT=port,
+        MAIL_SERVER="127.0.0.1",
+        MAIL_FROM_NAME="Contacts service",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=False,
+        TEMPLATE_FOLDER=Path("src/services/templates"),
+    )
+    return MailClient(config, pool_size=2, idle_timeout=idle_timeout)
+
+
+async def send_verify_email(client: MailClient, recipient: str):
+    await client.send_template(
+        "Confirm your email",
+        recipient,
+        "verify_email.html",
+        {"host": "http://test/", "username": "tester", "token": "token"},
+    )
+
+
+@pytest.mark.asyncio
+async def test_connection_is_reused(smtp_server):
+    client = create_mail_client(smtp_server.port)
+
+    for i in range(3):
+        await send_verify_email(client, f"user{i}@test.me")
+    await client.close()
+
+    assert len(smtp_server.messages) == 3
+    assert "user2@test.me" in smtp_server.messages[2]
+    assert smtp_server.connections == 1
+
+
+@pytest.mark.asyncio
+async def test_idle_connection_is_replaced(smtp_server):
+    client = create_mail_client(smtp_server.port, idle_timeout=0)
+
+    await send_verify_email(client, "user1@test.me")
+    await send_verify_email(client, "user2@test.me")
+    await client.close()
+
+    assert len(smtp_server.messages) == 2
+    assert smtp_server.connections == 2
+
+
+@pytest.mark.asyncio
+async def test_reconnect_after_server_disconnect(smtp_server):
+    client = create_mail_client(smtp_server.port)
+
+    await send_verify_email(client, "user1@test.me")
+    smtp_server.drop_connections()
+    await asyncio.sleep(0.05)
+    await send_verify_email(client, "user2@test.me")
+    await client.close()
+
+    assert len(smtp_server.messages) == 2
+    assert smtp_server.connections == 2
+
+
+class StaleSMTP:
+    """Pooled connection the server has dropped without the pool noticing."""
+
+    is_connected = True
+
+    async def send_message(self, message):
+        raise aiosmtplib.SMTPServerDisconnected("Connection lost")
+
+    def close(self):
+        self.is_connected = False
+
+
+@pytest.mark.asyncio
+async def test_retry_opens_new_connection():
+    pool = create_mail_client(port=25).pool
+    pool._idle = [(StaleSMTP(), time.monotonic()), (StaleSMTP(), time.monotonic())]
+    fresh = AsyncMock(spec=aiosmtplib.SMTP)
+    pool._connect = AsyncMock(return_value=fresh)
+
+    await pool.send(EmailMessage())
+
+    fresh.send_message.assert_awaited_once()
+    assert pool._connect.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_connection_is_reset_after_refused_message(smtp_server):
+    client = create_mail_client(smtp_server.port)
+
+    with pytest.raises(aiosmtplib.SMTPRecipientsRefused):
+        await send_verify_email(client, "rejected@test.me")
+    await send_verify_email(client, "user1@test.me")
+    await client.close()
+
+    assert smtp_server.resets >= 1
+    assert len(smtp_server.messages) == 1
+    assert smtp_server.connections == 1
+
+
+def test_templates_are_preloaded():
+    client = create_mail_client(port=25)
+
+    assert set(client.templates) == {"verify_email.html", "reset_password.html"}
+
+
+def test_render_is_measured():
+    client = create_mail_client(port=25)
+
+    message = client.build_message(
+        "Reset password",
+        "user@test.me",
+        "reset_password.html",
+        {"host": "http://test/", "username": "tester", "token": "abc"},
+    )
+
+    assert "Hi tester" in message.get_content()
+    assert "http://test/api/auth/password_reset/abc" in message.get_content()
+    assert client.rendered == 1
+    assert client.render_seconds > 0
@@ -0,0 +1,20 @@
+import pytest
+
+from benchmarks.import_time import eager_modules, import_times
+from src.database.db import DatabaseSessionManager
+
+
+def test_main_does_not_import_heavy_integrations():
+    assert eager_modules(import_times("main")) == []
+
+
+@pytest.mark.asyncio
+async def test_engine_is_created_on_init():
+    manager = DatabaseSessionManager("sqlite+aiosqlite://")
+    assert manager._engine is None
+
+    async with manager.session() as session:
+        assert session.bind is manager._engine
+
+    await manager.close()
+    assert manager._engine is None
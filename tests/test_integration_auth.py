@@ -1,11 +1,15 @@
-from unittest.mock import Mock
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
 from sqlalchemy import select
 
-from src.database.models import User
+from main import app
+from src.database.cache import Cache, get_cache
+from src.database.models import User, EmailOutbox, EmailKind, EmailStatus
 from src.services.auth import create_email_confirm_token, create_password_reset_token
-from tests.conftest import TestingSessionLocal
+from src.services.users import UserService
+from tests.conftest import DictCache, TestingSessionLocal
 
 user_data = {
     "username": "ron009",
@@ -14,9 +18,16 @@ user_data = {
 }
 
 
-def test_signup(client, monkeypatch):
-    mock_send_email = Mock()
-    monkeypatch.setattr("src.api.auth.send_confirm_email", mock_send_email)
+async def get_queued_emails(email: str, kind: EmailKind):
+    async with TestingSessionLocal() as session:
+        emails = await session.execute(
+            select(EmailOutbox).filter_by(recipient=email, kind=kind)
+        )
+        return emails.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_signup(client):
     response = client.post("api/auth/register", json=user_data)
     assert response.status_code == 201, response.text
     data = response.json()
@@ -25,15 +36,31 @@ def test_signup(client, monkeypatch):
     assert "hashed_password" not in data
     assert "avatar" in data
 
+    emails = await get_queued_emails(user_data["email"], EmailKind.CONFIRM_EMAIL)
+    assert len(emails) == 1
+    assert emails[0].status == EmailStatus.PENDING
 
-def test_repeat_signup(client, monkeypatch):
-    mock_send_email = Mock()
-    monkeypatch.setattr("src.api.auth.send_confirm_email", mock_send_email)
-    response = client.post("api/auth/register", json=user_data)
+
+@pytest.mark.asyncio
+async def test_repeat_signup(client):
+    with patch("src.services.auth.Hash.get_password_hash") as get_password_hash:
+        response = client.post("api/auth/register", json=user_data)
+    get_password_hash.assert_not_called()
     assert response.status_code == 409, response.text
     data = response.json()
     assert data["detail"] == "User already exists"
 
+    emails = await get_queued_emails(user_data["email"], EmailKind.CONFIRM_EMAIL)
+    assert len(emails) == 1
+
+
+def test_repeat_signup_case_insensitive(client):
+    response = client.post(
+        "api/auth/register",
+        json={**user_data, "username": "other", "email": user_data["email"].upper()},
+    )
+    assert response.status_code == 409, response.text
+
 
 def test_not_confirmed_login(client):
     response = client.post(
@@ -123,10 +150,7 @@ async def test_confirmed_email_success(client):
 
 
 @pytest.mark.asyncio
-async def test_request_email(client, monkeypatch):
-    mock_send_email = Mock()
-    monkeypatch.setattr("src.api.auth.send_confirm_email", mock_send_email)
-
+async def test_request_email(client):
     email = user_data.get("email")
     response = client.post("api/auth/request_email", json={"email": email})
     assert response.status_code == 200, response.text
@@ -137,10 +161,7 @@ async def test_request_email(client, monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_request_reset_password(client, monkeypatch):
-    mock_send_email = Mock()
-    monkeypatch.setattr("src.api.auth.send_reset_email", mock_send_email)
-
+async def test_request_reset_password(client):
     email = user_data.get("email")
     response = client.post("api/auth/request_reset_password", json={"email": email})
 
@@ -149,6 +170,72 @@ async def test_request_reset_password(client, monkeypatch):
     data = response.json()
     assert data["message"] == "Check your email"
 
+    emails = await get_queued_emails(email, EmailKind.RESET_PASSWORD)
+    assert len(emails) == 1
+
+
+@pytest.mark.asyncio
+async def test_request_reset_password_coalesced(client):
+    cache = DictCache()
+    default_cache_override = app.dependency_overrides[get_cache]
+    app.dependency_overrides[get_cache] = lambda: cache
+
+    email = user_data.get("email")
+    queued_before = len(await get_queued_emails(email, EmailKind.RESET_PASSWORD))
+    try:
+        for _ in range(3):
+            response = client.post(
+                "api/auth/request_reset_password", json={"email": email}
+            )
+            assert response.status_code == 200, response.text
+    finally:
+        app.dependency_overrides[get_cache] = default_cache_override
+
+    emails = await get_queued_emails(email, EmailKind.RESET_PASSWORD)
+    assert len(emails) == queued_before + 1
+
+
+@pytest.mark.asyncio
+async def test_failed_queue_does_not_coalesce_retry():
+    cache = DictCache()
+    async with TestingSessionLocal() as session:
+        user_service = UserService(session, cache)
+        user_service.repository.queue_email = AsyncMock(
+            side_effect=[ConnectionError("database is down"), None]
+        )
+        user = User(email="retry@test.me", username="retry")
+
+        with pytest.raises(ConnectionError):
+            await user_service.request_reset_email(user, "http://test/")
+        await user_service.request_reset_email(user, "http://test/")
+
+    assert user_service.repository.queue_email.await_count == 2
+    assert list(cache.data) == ["email:reset_password:retry@test.me"]
+
+
+@pytest.mark.asyncio
+async def test_email_queued_when_cache_is_down():
+    cache = Mock(spec=Cache)
+    cache.add.side_effect = RedisConnectionError("Redis is down")
+    async with TestingSessionLocal() as session:
+        user_service = UserService(session, cache)
+        user_service.repository.queue_email = AsyncMock()
+
+        await user_service.request_reset_email(
+            User(email="down@test.me", username="down"), "http://test/"
+        )
+
+    user_service.repository.queue_email.assert_awaited_once()
+
+
+def test_request_reset_password_unknown_email(client):
+    response = client.post(
+        "api/auth/request_reset_password", json={"email": "unknown@test.me"}
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.json()["message"] == "Check your email"
+
 
 @pytest.mark.asyncio
 async def test_get_password_reset_page(client):
@@ -1,3 +1,6 @@
+import csv
+import io
+import json
 from unittest.mock import patch, Mock
 
 from conftest import test_user
@@ -35,6 +38,35 @@ def test_get_contacts(client, get_token):
     assert "id" in data[0]
 
 
+def test_get_contacts_with_total(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    response = client.get("api/contacts?with_total=true", headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert response.headers["X-Total-Count"] == "1"
+
+    response = client.get("api/contacts", headers=headers)
+    assert "X-Total-Count" not in response.headers
+
+
+def test_get_contacts_fields(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    response = client.get("api/contacts?fields=id,first_name", headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert response.json() == [{"id": 1, "first_name": "Tester"}]
+
+    response = client.get(
+        "api/contacts/search?first_name=Tester&fields=email", headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == [{"email": "test@email.me"}]
+
+    response = client.get("api/contacts?fields=id,user_id", headers=headers)
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"] == "Unknown fields: user_id"
+
+
 def test_get_contact_by_id(client, get_token):
     response = client.get(
         "/api/contacts/1", headers={"Authorization": f"Bearer {get_token}"}
@@ -56,6 +88,29 @@ def test_get_contact_not_found(client, get_token):
     assert data["detail"] == "Contact not found"
 
 
+def test_get_contacts_by_ids(client, get_token):
+    response = client.get(
+        "/api/contacts/by_ids?ids=2&ids=1&ids=1",
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert [contact["id"] for contact in data["contacts"]] == [1]
+    assert data["missing"] == [2]
+
+
+def test_post_contacts_by_ids(client, get_token):
+    response = client.post(
+        "/api/contacts/by_ids",
+        json={"ids": [1, 3]},
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["contacts"][0]["first_name"] == "Tester"
+    assert data["missing"] == [3]
+
+
 def test_update_contact(client, get_token):
     response = client.put(
         "/api/contacts/1",
@@ -75,6 +130,42 @@ def test_update_contact(client, get_token):
     assert "id" in data
 
 
+def test_export_contacts_ndjson(client, get_token):
+    response = client.get(
+        "/api/contacts/export", headers={"Authorization": f"Bearer {get_token}"}
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = response.text.splitlines()
+    assert len(lines) == 1
+    data = json.loads(lines[0])
+    assert data["first_name"] == "Admin"
+    assert data["id"] == 1
+
+
+def test_export_contacts_csv(client, get_token):
+    response = client.get(
+        "/api/contacts/export?format=csv",
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]["first_name"] == "Admin"
+
+
+def test_export_contacts_resume(client, get_token):
+    response = client.get(
+        "/api/contacts/export?after_id=1",
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == 200, response.text
+    assert response.text == ""
+
+
 def test_delete_contact(client, get_token):
     response = client.delete(
         "/api/contacts/1", headers={"Authorization": f"Bearer {get_token}"}
@@ -83,3 +174,64 @@ def test_delete_contact(client, get_token):
     data = response.json()
     assert data["first_name"] == "Admin"
     assert "id" in data
+
+
+def test_batch_update_contacts(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    ids = []
+    for first_name in ("Batch", "Batch", "Other"):
+        response = client.post(
+            "/api/contacts",
+            json={
+                "first_name": first_name,
+                "last_name": "Contact",
+                "email": "batch@email.me",
+                "phone": "234 343 34 55",
+                "date_of_birth": "1993-10-21",
+                "info": "This is batch contact",
+            },
+            headers=headers,
+        )
+        ids.append(response.json()["id"])
+
+    response = client.post(
+        "/api/contacts/batch_update",
+        json={"filter": {"first_name": "Batch"}, "values": {"info": "Updated"}},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    assert sorted(response.json()["ids"]) == ids[:2]
+
+
+def test_batch_delete_contacts(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    response = client.get("/api/contacts", headers=headers)
+    ids = [contact["id"] for contact in response.json()]
+
+    response = client.post(
+        "/api/contacts/batch_delete", json={"ids": ids + [1000]}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert sorted(response.json()["ids"]) == sorted(ids)
+
+    response = client.get("/api/contacts?with_total=true", headers=headers)
+    assert response.json() == []
+    assert response.headers["X-Total-Count"] == "0"
+
+
+def test_batch_delete_limits_ids(client, get_token):
+    response = client.post(
+        "/api/contacts/batch_delete",
+        json={"ids": list(range(1, 1002))},
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == 422, response.text
+
+
+def test_batch_delete_requires_selection(client, get_token):
+    response = client.post(
+        "/api/contacts/batch_delete",
+        json={"filter": {}},
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == 400, response.text
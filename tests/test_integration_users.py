@@ -1,3 +1,4 @@
+import threading
 from unittest.mock import patch, Mock
 
 from conftest import test_user
@@ -32,3 +33,47 @@ def test_update_avatar_user(mock_upload_file, client, get_token):
     assert data["avatar"] == fake_url
 
     mock_upload_file.assert_called_once()
+
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+
+
+def test_update_avatar_rejects_non_image(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+
+    file_data = {"file": ("avatar.txt", b"plain text", "text/plain")}
+    response = client.patch("/api/users/avatar", headers=headers, files=file_data)
+    assert response.status_code == 415, response.text
+
+    file_data = {"file": ("avatar.jpg", b"fake image content", "image/jpeg")}
+    response = client.patch("/api/users/avatar", headers=headers, files=file_data)
+    assert response.status_code == 415, response.text
+
+
+def test_update_avatar_rejects_large_file(client, get_token, monkeypatch):
+    monkeypatch.setattr("src.services.upload_file.settings.AVATAR_MAX_SIZE", 50)
+    headers = {"Authorization": f"Bearer {get_token}"}
+
+    file_data = {"file": ("avatar.png", PNG_HEADER, "image/png")}
+    response = client.patch("/api/users/avatar", headers=headers, files=file_data)
+    assert response.status_code == 413, response.text
+
+
+@patch("cloudinary.uploader.upload")
+def test_update_avatar_uploads_in_executor(mock_upload, client, get_token):
+    threads = []
+
+    def upload(file, **kwargs):
+        threads.append(threading.current_thread().name)
+        assert file.read() == PNG_HEADER
+        return {"version": 1}
+
+    mock_upload.side_effect = upload
+    headers = {"Authorization": f"Bearer {get_token}"}
+
+    file_data = {"file": ("avatar.png", PNG_HEADER, "image/png")}
+    response = client.patch("/api/users/avatar", headers=headers, files=file_data)
+
+    assert response.status_code == 200, response.text
+    assert "RestApp/" in response.json()["avatar"]
+    assert threads[0].startswith("upload")
@@ -0,0 +1,68 @@
+import os
+import tracemalloc
+
+import pytest
+
+from src.services.memory import MemoryDiagnostics, gc_stats
+
+
+class Leak:
+    pass
+
+
+@pytest.fixture
+def diagnostics():
+    diagnostics = MemoryDiagnostics(max_snapshots=2)
+    diagnostics.start(frames=5)
+    yield diagnostics
+    diagnostics.stop()
+
+
+def test_diff_shows_allocation_site(diagnostics):
+    base = diagnostics.take_snapshot()
+    leaked = [bytearray(10_000) for _ in range(100)]
+    snapshot = diagnostics.take_snapshot()
+
+    diff = diagnostics.diff(snapshot["id"], base["id"], "lineno", 5)
+
+    assert diff["pid"] == os.getpid()
+    assert "test_memory.py" in diff["sites"][0]["traceback"][0]
+    assert diff["sites"][0]["size_diff"] >= 1_000_000
+    top = diagnostics.top(snapshot["id"], "lineno", 3)
+    assert top["sites"][0]["size"] >= 1_000_000
+    assert snapshot["size"] >= 1_000_000
+    assert diagnostics.status()["snapshots"][1]["size"] == snapshot["size"]
+    del leaked
+
+
+def test_old_snapshots_are_dropped(diagnostics):
+    first = diagnostics.take_snapshot()
+    diagnostics.take_snapshot()
+    diagnostics.take_snapshot()
+
+    assert len(diagnostics.status()["snapshots"]) == 2
+    assert diagnostics.top(first["id"], "lineno", 10) is None
+    assert diagnostics.diff(first["id"], first["id"] + 1, "lineno", 10) is None
+
+
+def test_stop_clears_snapshots():
+    diagnostics = MemoryDiagnostics(max_snapshots=2)
+    diagnostics.start(frames=1)
+    diagnostics.take_snapshot()
+
+    status = diagnostics.stop()
+
+    assert status["tracing"] is False
+    assert status["snapshots"] == []
+    assert not tracemalloc.is_tracing()
+
+
+def test_gc_stats_counts_objects_per_type():
+    leaks = [Leak() for _ in range(1000)]
+
+    stats = gc_stats(limit=10_000)
+
+    counts = {entry["type"]: entry["count"] for entry in stats["types"]}
+    assert counts[f"{__name__}.Leak"] >= 1000
+    assert len(stats["generations"]) == 3
+    del leaks
@@ -0,0 +1,136 @@
+import json
+import os
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.conf.config import settings
+from src.services.metrics import (
+    AGGREGATE_NAME,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    instrument_engine,
+)
+
+
+def create_registry(directory=None) -> Registry:
+    registry = Registry(directory)
+    registry.register(Counter("requests_total", "Requests.", ("route",)))
+    registry.register(Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0)))
+    return registry
+
+
+def write_snapshot(path, registry: Registry):
+    with open(path, "w") as file:
+        json.dump(registry.snapshot(), file)
+
+
+def test_render_counter_and_histogram():
+    registry = create_registry()
+    registry.metrics["requests_total"].inc("/a")
+    registry.metrics["requests_total"].inc("/a")
+    registry.metrics["latency_seconds"].observe(value=0.05)
+    registry.metrics["latency_seconds"].observe(value=5)
+
+    text = registry.render()
+
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a"} 2.0' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "latency_seconds_count 2" in text
+
+
+def test_snapshots_are_merged_across_workers(tmp_path):
+    worker = create_registry(str(tmp_path))
+    worker.metrics["requests_total"].inc("/a", amount=3)
+    worker.metrics["latency_seconds"].observe(value=0.5)
+    worker.flush()
+    # another worker process of the same server, with its own snapshot file
+    os.rename(
+        tmp_path / worker.snapshot_name, tmp_path / f"metrics_{os.getppid()}_1.json"
+    )
+
+    registry = create_registry(str(tmp_path))
+    registry.metrics["requests_total"].inc("/a")
+    registry.metrics["latency_seconds"].observe(value=0.5)
+    text = registry.render()
+
+    assert 'requests_total{route="/a"} 4.0' in text
+    assert "latency_seconds_count 2" in text
+
+
+def test_finished_workers_are_folded_into_one_file(tmp_path):
+    registry = create_registry(str(tmp_path))
+    registry.register(Gauge("in_flight", "Requests in flight."))
+    # no process has this pid, so the snapshots belong to finished workers
+    for number in range(3):
+        registry.metrics["requests_total"].values = {("/a",): 1.0}
+        registry.metrics["in_flight"].values = {(): 7}
+        write_snapshot(tmp_path / f"metrics_999999999_{number}.json", registry)
+    registry.metrics["requests_total"].values = {}
+    registry.metrics["in_flight"].values = {}
+
+    first = registry.render()
+    second = registry.render()
+
+    assert 'requests_total{route="/a"} 3.0' in first
+    assert second == first
+    assert "in_flight 7" not in first
+    names = {name for name in os.listdir(tmp_path) if name.endswith(".json")}
+    assert names == {AGGREGATE_NAME, registry.snapshot_name}
+
+
+def test_flush_runs_in_background(tmp_path):
+    registry = create_registry(str(tmp_path))
+    registry.flush_interval = 0.01
+    registry.metrics["requests_total"].inc("/a")
+
+    registry.start()
+    registry.close()
+
+    with open(tmp_path / registry.snapshot_name) as file:
+        snapshot = json.load(file)
+    assert snapshot["requests_total"]["samples"] == [[["/a"], 1.0]]
+    assert registry.thread is None
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_does_not_leak_start_time():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    instrument_engine(engine)
+
+    async with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            await conn.execute(text("SELECT * FROM missing_table"))
+        await conn.execute(text("SELECT 1"))
+
+        assert conn.sync_connection.info["query_start"] == []
+    await engine.dispose()
+
+
+def test_metrics_endpoint_requires_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scraper-token")
+    response = client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401
+
+
+def test_metrics_endpoint(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scraper-token")
+    client.get("/api/contacts")
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer scraper-token"})
+
+    assert response.status_code == 200
+    assert 'http_requests_total{method="GET",route="/api/contacts/",status="401"}' in (
+        response.text
+    )
+    assert 'email_outbox_emails{status="queued"}' in response.text
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.api.profiler import ProfilerMiddleware
+from src.database.cache import Cache, get_cache
+from src.services.auth import create_access_token
+from src.services.profiler import ProfilingSession, SamplingProfiler, list_profiles
+
+
+def busy_loop(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class BrokenCache(Cache):
+    def get(self, key):
+        raise RedisConnectionError("Redis is down")
+
+    def put(self, key, value, ttl=3600):
+        raise RedisConnectionError("Redis is down")
+
+    def add(self, key, value, ttl):
+        raise RedisConnectionError("Redis is down")
+
+    def delete(self, key):
+        raise RedisConnectionError("Redis is down")
+
+
+def create_app(directory, **options) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(
+        ProfilerMiddleware, directory=str(directory), interval=0.001, **options
+    )
+
+    @app.get("/busy")
+    async def busy():
+        busy_loop(0.05)
+        return {"done": True}
+
+    @app.get("/missing")
+    async def missing():
+        raise HTTPException(status_code=404, detail="Not found")
+
+    return app
+
+
+def create_client(directory, is_admin: bool, **options) -> TestClient:
+    async def authorize(scope):
+        return is_admin
+
+    return TestClient(create_app(directory, authorize=authorize, **options))
+
+
+def test_cpu_profile_contains_hot_function():
+    profiler = SamplingProfiler([threading.get_ident()], interval=0.001, mode="cpu")
+    profiler.start()
+    busy_loop(0.1)
+    profiler.stop()
+
+    lines = profiler.collapsed().splitlines()
+    assert lines
+    assert any("busy_loop" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+
+
+def test_profile_returned_in_response(tmp_path):
+    response = create_client(tmp_path, is_admin=True).get(
+        "/busy?profile=wall&profile_output=response"
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "busy_loop" in response.text
+
+
+def test_error_status_kept_in_response_mode(tmp_path):
+    response = create_client(tmp_path, is_admin=True).get(
+        "/missing?profile=wall&profile_output=response"
+    )
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Not found"}
+
+
+def test_old_profiles_are_removed(tmp_path):
+    client = create_client(tmp_path, is_admin=True, keep=2)
+
+    names = [
+        client.get("/busy?profile=wall").headers["x-profile-file"] for _ in range(3)
+    ]
+
+    assert [profile["name"] for profile in list_profiles(str(tmp_path))] == names[1:]
+
+
+@pytest.mark.asyncio
+async def test_profiling_skipped_when_cache_is_down(tmp_path):
+    token = await create_access_token(data={"sub": "admin"})
+    app = create_app(tmp_path)
+    app.dependency_overrides[get_cache] = BrokenCache
+
+    response = TestClient(app).get(
+        "/busy?profile=wall", headers={"Authorization": f"Bearer {token}"}
+    )
+
+    assert response.json() == {"done": True}
+    assert "x-profile-file" not in response.headers
+
+
+def test_profile_stored_in_file(tmp_path):
+    response = create_client(tmp_path, is_admin=True).get(
+        "/busy", headers={"X-Profile": "cpu"}
+    )
+
+    assert response.json() == {"done": True}
+    name = response.headers["x-profile-file"]
+    assert [profile["name"] for profile in list_profiles(str(tmp_path))] == [name]
+    assert "busy_loop" in (tmp_path / name).read_text()
+
+
+def test_profile_ignored_for_non_admin(tmp_path):
+    response = create_client(tmp_path, is_admin=False).get("/busy?profile=wall")
+
+    assert response.json() == {"done": True}
+    assert "x-profile-file" not in response.headers
+    assert list_profiles(str(tmp_path)) == []
+
+
+@pytest.mark.asyncio
+async def test_profiling_session_is_time_boxed(tmp_path):
+    session = ProfilingSession()
+
+    session.start(0.05, "wall", 0.001, str(tmp_path))
+    assert session.status()["running"]
+    await asyncio.wait_for(session.task, 1)
+
+    status = session.status()
+    assert not status["running"]
+    assert (tmp_path / status["file"]).exists()
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from slowapi import Limiter
+from slowapi.errors import RateLimitExceeded
+from starlette.requests import Request
+
+from src.conf.config import settings
+from src.services.rate_limit import limit_description, limiter, rate_limit_key
+
+
+def create_request(username: str | None = None) -> Request:
+    request = Request({"type": "http", "headers": [], "client": ("10.0.0.1", 1234)})
+    if username is not None:
+        request.state.username = username
+    return request
+
+
+def test_key_combines_ip_and_user():
+    assert rate_limit_key(create_request("rontest")) == "10.0.0.1:rontest"
+    assert rate_limit_key(create_request()) == "10.0.0.1:anonymous"
+
+
+def test_limit_description(monkeypatch):
+    monkeypatch.setitem(settings.RATE_LIMITS, "users_me", "5/minute")
+    assert limit_description("users_me") == "No more than 5 requests per minute"
+
+    monkeypatch.setitem(settings.RATE_LIMITS, "users_me", "10 per 2 hours")
+    assert limit_description("users_me") == "No more than 10 requests per 2 hours"
+
+
+def test_me_is_rate_limited(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+
+    statuses = [
+        client.get("api/users/me", headers=headers).status_code for _ in range(6)
+    ]
+
+    assert statuses[0] == 200
+    assert statuses[-1] == 429
+
+
+def test_limit_is_checked_off_the_event_loop(client, get_token, monkeypatch):
+    loops = []
+    check = limiter._check_request_limit
+
+    def record_loop(*args):
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        return check(*args)
+
+    monkeypatch.setattr(limiter, "_check_request_limit", record_loop)
+    client.get("api/users/me", headers={"Authorization": f"Bearer {get_token}"})
+
+    assert loops == [None]
+
+
+def test_private_slowapi_names_used_by_rate_limit():
+    # rate_limit() checks the limit itself and marks the request as checked,
+    # this breaks loudly if a slowapi upgrade renames either
+    guard = Limiter(key_func=lambda request: "guard", storage_uri="memory://")
+
+    async def endpoint(request: Request):
+        return "ok"
+
+    limited = guard.limit("1/minute")(endpoint)
+    request = Request({"type": "http", "path": "/guard", "headers": []})
+
+    guard._check_request_limit(request, endpoint, False)
+    with pytest.raises(RateLimitExceeded):
+        guard._check_request_limit(request, endpoint, False)
+
+    request.state._rate_limiting_complete = True
+    assert asyncio.run(limited(request=request)) == "ok"
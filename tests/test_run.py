@@ -0,0 +1,25 @@
+import os
+from unittest.mock import patch
+
+from main import run
+
+
+@patch.dict(os.environ)
+@patch("uvicorn.run")
+def test_run_production(mock_run):
+    run(["--workers", "2"])
+
+    kwargs = mock_run.call_args.kwargs
+    assert kwargs["workers"] == 2
+    assert kwargs["limit_max_requests"] == 10000
+    assert "reload" not in kwargs
+    assert os.path.isdir(os.environ["METRICS_DIR"])
+
+
+@patch("uvicorn.run")
+def test_run_reload(mock_run):
+    run(["--reload"])
+
+    kwargs = mock_run.call_args.kwargs
+    assert kwargs["reload"] is True
+    assert "workers" not in kwargs
@@ -0,0 +1,49 @@
+import logging
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.server_timing import ServerTimingMiddleware
+from src.services.request_timing import timed, track_engine
+from tests.conftest import TestingSessionLocal, engine
+
+track_engine(engine)
+
+app = FastAPI()
+app.add_middleware(ServerTimingMiddleware, query_budget=3, repeat_threshold=2)
+
+
+async def get_session():
+    async with TestingSessionLocal() as session:
+        yield session
+
+
+@app.get("/queries/{count}")
+async def run_queries(count: int, db: AsyncSession = Depends(get_session)):
+    for _ in range(count):
+        await db.execute(text("SELECT 1"))
+    with timed("cache"):
+        pass
+    return {"count": count}
+
+
+client = TestClient(app)
+
+
+def test_server_timing_header():
+    response = client.get("/queries/1")
+
+    entries = response.headers["server-timing"].split(", ")
+    assert [entry.split(";")[0] for entry in entries] == ["db", "cache", "auth"]
+    assert 'desc="1 queries"' in entries[0]
+
+
+def test_repeated_statements_are_logged(caplog):
+    with caplog.at_level(logging.WARNING, logger="src.api.server_timing"):
+        client.get("/queries/4")
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert "GET /queries/4 ran 4 SQL statements, budget is 3" in messages
+    assert any("repeated the same SQL statement 4 times" in m for m in messages)
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.tracing import TracingMiddleware
+from src.services.tracing import Exporter, Tracer, span, traced, traced_methods
+
+
+@traced_methods
+class Service:
+    async def load(self, value):
+        with span("inner", value=value):
+            return value
+
+    def _private(self):
+        return None
+
+
+def create_client(tmp_path, sample_rate: float, trusted_hosts=()) -> TestClient:
+    app = FastAPI()
+    tracer = Tracer(sample_rate, Exporter(str(tmp_path / "traces.jsonl")))
+    app.add_middleware(TracingMiddleware, tracer=tracer, trusted_hosts=trusted_hosts)
+    app.state.tracer = tracer
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": await Service().load(item_id)}
+
+    return TestClient(app)
+
+
+def read_traces(client: TestClient, tmp_path) -> list:
+    client.app.state.tracer.exporter.flush()
+    path = tmp_path / "traces.jsonl"
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_sampled_request_is_exported(tmp_path):
+    client = create_client(tmp_path, 1.0)
+    response = client.get("/items/7")
+
+    [trace] = read_traces(client, tmp_path)
+    spans = {span["name"]: span for span in trace}
+    root = spans["GET /items/{item_id}"]
+    assert root["kind"] == "SERVER"
+    assert root["tags"]["http.status_code"] == "200"
+    assert response.headers["x-b3-traceid"] == root["traceId"]
+    assert spans["Service.load"]["parentId"] == root["id"]
+    assert spans["inner"]["parentId"] == spans["Service.load"]["id"]
+    assert spans["inner"]["tags"] == {"value": "7"}
+
+
+def test_unsampled_request_is_not_exported(tmp_path):
+    client = create_client(tmp_path, 0.0)
+
+    response = client.get("/items/7")
+    assert response.json() == {"id": 7}
+    assert "x-b3-traceid" not in response.headers
+    assert read_traces(client, tmp_path) == []
+
+
+def test_b3_headers_honored_only_from_trusted_hosts(tmp_path):
+    headers = {"X-B3-Sampled": "1", "X-B3-TraceId": "a" * 32}
+
+    # tracing disabled: upstream decisions are ignored even from trusted hosts
+    disabled = create_client(tmp_path, 0.0, trusted_hosts=["testclient"])
+    disabled.get("/items/7", headers=headers)
+    assert read_traces(disabled, tmp_path) == []
+
+    untrusted = create_client(tmp_path, 1e-9)
+    untrusted.get("/items/7", headers=headers)
+    assert read_traces(untrusted, tmp_path) == []
+
+    trusted = create_client(tmp_path, 1e-9, trusted_hosts=["testclient"])
+    trusted.get("/items/7", headers=headers)
+    [trace] = read_traces(trusted, tmp_path)
+    assert {span["traceId"] for span in trace} == {"a" * 32}
+
+
+def test_exporter_writes_in_background(tmp_path):
+    exporter = Exporter(str(tmp_path / "traces.jsonl"))
+    tracer = Tracer(1.0, exporter)
+    for _ in range(3):
+        tracer.end_trace(tracer.start_trace("job"))
+
+    exporter.close()
+
+    lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+    assert len(lines) == 3
+    assert exporter.thread is None
+
+
+@pytest.mark.asyncio
+async def test_traced_without_trace():
+    assert await Service().load(1) == 1
+    assert traced(lambda: 2)() == 2
+    assert not hasattr(Service._private, "__wrapped__")
@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.repository.users import UserRepository
 from src.database.models import User
@@ -24,7 +25,47 @@ async def test_create_user(user_repository: UserRepository, mock_session: AsyncM
     )
 
     mock_result = MagicMock()
+    mock_result.scalar_one.return_value = User(
+        id=1, username=user_model.username, email=user_model.email, avatar="testavatar"
+    )
+    mock_session.execute = AsyncMock(return_value=mock_result)
 
     result = await user_repository.create_user(user_model, "testavatar")
     assert isinstance(result, User)
     assert result.username == "new_user"
+    # insert, user counters and daily signups
+    assert mock_session.execute.await_count == 3
+    mock_session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_create_user_conflict(
+    user_repository: UserRepository, mock_session: AsyncMock
+):
+    user_model = UserCreate(
+        username="new_user", email="user@test.com", password="123456789"
+    )
+    mock_session.execute = AsyncMock(
+        side_effect=IntegrityError("INSERT", {}, Exception("unique"))
+    )
+
+    with pytest.raises(IntegrityError):
+        await user_repository.create_user(user_model, "testavatar")
+    mock_session.rollback.assert_awaited_once()
+    mock_session.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_update_avatar_url(
+    user_repository: UserRepository, mock_session: AsyncMock
+):
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = User(
+        id=1, username="new_user", email="user@test.com", avatar="new_avatar"
+    )
+    mock_session.execute = AsyncMock(return_value=mock_result)
+
+    result = await user_repository.update_avatar_url("user@test.com", "new_avatar")
+    assert result.avatar == "new_avatar"
+    mock_session.execute.assert_awaited_once()
+    mock_session.refresh.assert_not_awaited()